@@ -1,6 +1,7 @@
 import re
 import time
 import logging
+import threading
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
@@ -10,22 +11,121 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 from webdriver_manager.chrome import ChromeDriverManager
 import json
+from throttle import TokenBucket, CircuitBreaker
+from metrics import Histogram, Gauge, CallbackGauge
 
-# Configure logging to file instead of console
+try:
+    import psutil
+except ImportError:  # psutil is optional, only needed for the Chrome memory gauge
+    psutil = None
+
+# Configure logging to file instead of console; the API replaces this with its structured pipeline
 logging.basicConfig(
     filename='tracker.log',
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
+logger = logging.getLogger('tracker')
+
+# Shared by every scrape in this process so a traffic spike cannot hammer tracker.ftgames.com
+tracker_rate_limiter = TokenBucket(rate=0.5, capacity=3)
+# Opens after repeated failed page loads so we stop launching browsers that will time out
+tracker_circuit = CircuitBreaker(failure_threshold=5, reset_timeout=60)
+
+# Longest a scrape waits for a rate limit token before giving up
+RATE_LIMIT_WAIT = 30
+
+SCRAPE_PHASE_SECONDS = Histogram(
+    'scrape_phase_seconds',
+    'Time spent in each scrape phase; phase="total" covers the whole scrape',
+    labelnames=('phase', 'outcome')
+)
+CHROME_SESSIONS = Gauge('chrome_sessions_active', 'Chrome sessions currently open by scrapers')
+# Default budget for one scrape, from the rate limit wait to the last element read
+SCRAPE_DEADLINE = 60
+# Time past the deadline a stuck driver call gets before the watchdog closes the browser under it
+WATCHDOG_GRACE = 5
+
+
+class ScrapeAborted(Exception):
+    def __init__(self, reason):
+        """
+        Raised inside a scrape once its deadline has passed or its caller gave up
+
+        :param reason: 'deadline' or 'cancelled'
+        """
+        super().__init__('Scrape deadline exceeded' if reason == 'deadline' else 'Scrape cancelled')
+        self.reason = reason
+
+
+class ScrapeDeadline:
+    def __init__(self, seconds, cancel_event=None):
+        """
+        Time budget shared by every wait in one scrape
+
+        Each wait asks for the time it would like and gets at most what is left, so a slow
+        page eats into the later waits instead of adding to them.
+
+        :param seconds: Total budget
+        :param cancel_event: Optional threading.Event the caller sets when it no longer wants the result
+        """
+        self.expires = time.monotonic() + seconds
+        self.cancel_event = cancel_event or threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def remaining(self):
+        return self.expires - time.monotonic()
+
+    def check(self):
+        """Raise ScrapeAborted if the scrape should stop"""
+        if self.cancelled:
+            raise ScrapeAborted('cancelled')
+        if self.remaining() <= 0:
+            raise ScrapeAborted('deadline')
+
+    def budget(self, seconds):
+        """Seconds a wait may take: what it asked for, capped by what is left"""
+        self.check()
+        return min(seconds, self.remaining())
+
+    def sleep(self, seconds):
+        """Sleep from the budget, waking early if the scrape is cancelled"""
+        if self.cancel_event.wait(self.budget(seconds)):
+            raise ScrapeAborted('cancelled')
+
+
+def chrome_rss_bytes():
+    """Resident memory of Chrome processes started by this process, if psutil is installed"""
+    if psutil is None:
+        return {}
+    total = 0
+    for child in psutil.Process().children(recursive=True):
+        try:
+            if 'chrom' in child.name().lower():
+                total += child.memory_info().rss
+        except psutil.Error:
+            continue
+    return {(): total}
+
+
+CallbackGauge('chrome_rss_bytes', 'Resident memory of Chrome and chromedriver processes', chrome_rss_bytes)
 
 class TrackerScraper:
-    def __init__(self, user_id, headless=False, logging_level='minimal'):
+    def __init__(self, user_id, headless=False, logging_level='minimal', progress_callback=None, deadline=None):
         """
         Initialize the TrackerScraper
         
         :param user_id: 8-character DLL Tracker ID
         :param headless: Whether to run browser in headless mode (invisible)
         :param logging_level: 'minimal', 'standard', or 'verbose'
+        :param progress_callback: Optional callable invoked with the name of each scrape phase
+        :param deadline: ScrapeDeadline every wait draws from; defaults to SCRAPE_DEADLINE seconds
         """
         # Validate and format user ID
         self.user_id = user_id.lower()
@@ -35,6 +135,12 @@ class TrackerScraper:
         # Set logging level and headless mode
         self.logging_level = logging_level
         self.headless = headless
+        self.progress_callback = progress_callback
+        self.deadline = deadline or ScrapeDeadline(SCRAPE_DEADLINE)
+        self._phase = None
+        self._phase_started = None
+        self._close_lock = threading.Lock()
+        self._finished = threading.Event()
 
         # Configure Chrome options with headless mode
         chrome_options = Options()
@@ -49,10 +155,23 @@ class TrackerScraper:
         chrome_options.add_experimental_option('useAutomationExtension', False)
 
         # Initialize the WebDriver
-        self.driver = webdriver.Chrome(
-            service=Service(ChromeDriverManager().install()),
-            options=chrome_options
-        )
+        started = time.perf_counter()
+        try:
+            self.driver = webdriver.Chrome(
+                service=Service(ChromeDriverManager().install()),
+                options=chrome_options
+            )
+        except Exception:
+            SCRAPE_PHASE_SECONDS.observe(time.perf_counter() - started, phase='browser_start', outcome='error')
+            raise
+        SCRAPE_PHASE_SECONDS.observe(time.perf_counter() - started, phase='browser_start', outcome='ok')
+        CHROME_SESSIONS.inc()
+        try:
+            # Implicit waits are set per lookup from the remaining budget, never left at a fixed value
+            self.driver.implicitly_wait(0)
+        except Exception:
+            self.close()
+            raise
 
         # Construct user URL
         self.user_url = f"https://tracker.ftgames.com/?id={self.user_id}"
@@ -66,6 +185,8 @@ class TrackerScraper:
         self.team_form = []
         self.match_stats = {}
         self.goals = []
+        # Set when the tracker itself reports the ID does not exist
+        self.invalid_id = False
         
     def log(self, message, level='info'):
         """Log messages based on the configured verbosity"""
@@ -75,29 +196,82 @@ class TrackerScraper:
         if self.logging_level == 'standard' and level == 'debug':
             return
             
-        if level == 'error':
-            logging.error(message)
-        elif level == 'warning':
-            logging.warning(message)
-        elif level == 'info':
-            logging.info(message)
-        elif level == 'debug':
-            logging.debug(message)
+        levels = {
+            'error': logging.ERROR,
+            'warning': logging.WARNING,
+            'info': logging.INFO,
+            'debug': logging.DEBUG
+        }
+        if level in levels:
+            logger.log(levels[level], message, extra={'fields': {'team_id': self.user_id}})
+
+    def wait(self, seconds):
+        """WebDriverWait drawing on the scrape's remaining budget"""
+        return WebDriverWait(self.driver, self.deadline.budget(seconds))
+
+    def close(self):
+        """Shut Chrome down, killing chromedriver if a clean quit fails; safe to call more than once"""
+        with self._close_lock:
+            driver, self.driver = getattr(self, 'driver', None), None
+        if driver is None:
+            return
+        try:
+            driver.quit()
+        except Exception as e:
+            self.log(f"Browser did not quit cleanly: {str(e)}", 'error')
+            try:
+                driver.service.stop()
+            except Exception:
+                pass
+        finally:
+            CHROME_SESSIONS.dec()
+
+    def _watchdog(self):
+        # A single driver call can block past the deadline (a hung page load, a dead renderer);
+        # closing the browser under it makes that call fail so the scrape can return
+        while not self._finished.wait(0.5):
+            if self.deadline.cancelled or self.deadline.remaining() < -WATCHDOG_GRACE:
+                if not self._finished.is_set():
+                    self.log("Scrape overran its deadline or was cancelled, closing the browser", 'error')
+                    self.close()
+                return
+
+    def end_phase(self, outcome='ok'):
+        """Record how long the current scrape phase took"""
+        if self._phase is None:
+            return
+        SCRAPE_PHASE_SECONDS.observe(time.perf_counter() - self._phase_started, phase=self._phase, outcome=outcome)
+        self._phase = None
+
+    def report_progress(self, phase):
+        """Start timing a scrape phase and notify the progress callback (if any)"""
+        self.end_phase()
+        self._phase = phase
+        self._phase_started = time.perf_counter()
+        if not self.progress_callback:
+            return
+        try:
+            self.progress_callback(phase)
+        except Exception as e:
+            self.log(f"Progress callback failed: {str(e)}", 'debug')
         
     def validate_tracker_id(self):
         """Check if the tracker ID is valid"""
         try:
+            self.driver.set_page_load_timeout(self.deadline.budget(30))
             self.driver.get(self.user_url)
             
             # Wait for the page to load fully - longer wait if headless
             wait_time = 5 if not self.headless else 10
-            time.sleep(wait_time)
+            self.deadline.sleep(wait_time)
             
             # Look for elements that indicate page load
             try:
-                WebDriverWait(self.driver, 15).until(  # Increased timeout
+                self.wait(15).until(  # Increased timeout
                     EC.presence_of_element_located((By.CSS_SELECTOR, "body"))
                 )
+            except ScrapeAborted:
+                raise
             except:
                 self.log("Page did not load properly", 'error')
                 return False
@@ -109,6 +283,7 @@ class TrackerScraper:
                     "//*[contains(text(), 'Could not find player')]"
                 )
                 if invalid_divs:
+                    self.invalid_id = True
                     self.log("Invalid Tracker ID", 'error')
                     return False
             except:
@@ -116,6 +291,8 @@ class TrackerScraper:
 
             return True
 
+        except ScrapeAborted:
+            raise
         except Exception as e:
             self.log(f"Error validating ID: {str(e)}", 'error')
             return False
@@ -157,12 +334,14 @@ class TrackerScraper:
             
             for selector in selectors:
                 try:
-                    team_name_element = WebDriverWait(self.driver, 10).until(
+                    team_name_element = self.wait(10).until(
                         EC.presence_of_element_located((By.CSS_SELECTOR, selector))
                     )
                     self.player_team_name = team_name_element.text
                     self.log(f"Team name: {self.player_team_name}", 'debug')
                     break
+                except ScrapeAborted:
+                    raise
                 except:
                     continue
             
@@ -187,6 +366,8 @@ class TrackerScraper:
                 self.log(f"Extracted {len(self.opponent_team_names)} opponent names", 'debug')
                 return True
             return False
+        except ScrapeAborted:
+            raise
         except Exception as e:
             self.log(f"Error extracting team names: {str(e)}", 'error')
             return False
@@ -296,7 +477,7 @@ class TrackerScraper:
             return {}
         
         try:
-            self.driver.implicitly_wait(5)
+            self.driver.implicitly_wait(self.deadline.budget(5))
             
             # Match info for context
             match_info = self.matches[match_index] if match_index < len(self.matches) else {
@@ -320,7 +501,7 @@ class TrackerScraper:
             # Wait for the stats panel to appear
             try:
                 stats_panel_xpath = '//div[contains(@class, "flex-1 w-full p-2 animate-in slide-in-from-left-10 fade-in-50")]'
-                WebDriverWait(self.driver, 5).until(EC.presence_of_element_located((By.XPATH, stats_panel_xpath)))
+                self.wait(5).until(EC.presence_of_element_located((By.XPATH, stats_panel_xpath)))
             except TimeoutException:
                 self.log("Stats panel did not appear, trying alternative approach", 'debug')
                 # Alternative click approach
@@ -337,11 +518,11 @@ class TrackerScraper:
                         }}, 700);
                     }}
                 """)
-                time.sleep(1.5)
+                self.deadline.sleep(1.5)
                 
                 # Try waiting again
                 try:
-                    WebDriverWait(self.driver, 5).until(EC.presence_of_element_located((By.XPATH, stats_panel_xpath)))
+                    self.wait(5).until(EC.presence_of_element_located((By.XPATH, stats_panel_xpath)))
                 except TimeoutException:
                     self.log("Could not get stats panel to appear", 'warning')
                     return {}
@@ -395,9 +576,18 @@ class TrackerScraper:
             self.log(f"Extracted {len(match_statistics['stats'])} statistics", 'debug')
             return match_statistics
 
+        except ScrapeAborted:
+            raise
         except Exception as e:
             self.log(f"Error extracting match statistics: {str(e)}", 'error')
             return {}
+        finally:
+            # Later lookups run against rendered cards and should not wait on misses
+            if self.driver is not None:
+                try:
+                    self.driver.implicitly_wait(0)
+                except Exception:
+                    pass
             
     def extract_goals(self, match_index=0):
         """Extract goal scorers and their details for a specific match"""
@@ -498,15 +688,27 @@ class TrackerScraper:
             return False
     
     def scrape(self):
-        """Main method to scrape all data using optimized approach"""
+        """
+        Main method to scrape all data using optimized approach
+
+        Stops at the next wait or step once the deadline passes or the scrape is cancelled, and
+        always closes the browser before returning.
+        """
+        outcome = 'error'
+        watchdog = threading.Thread(target=self._watchdog, name=f"scrape-watchdog-{self.user_id}", daemon=True)
+        watchdog.start()
         try:
+            self.report_progress('loading_page')
             if self.validate_tracker_id():
                 # First extract all match cards once
+                self.deadline.check()
+                self.report_progress('reading_matches')
                 if self.extract_match_cards():
                     # Then extract team names (both player's team and opponents)
                     self.extract_team_names()
                     
                     # Extract team overview stats
+                    self.deadline.check()
                     self.extract_team_overview()
                     
                     # Process all matches with team names
@@ -516,23 +718,53 @@ class TrackerScraper:
                     self.extract_team_form()
                     
                     # Extract statistics for the most recent match
+                    self.deadline.check()
+                    self.report_progress('reading_match_stats')
                     self.match_stats = self.extract_match_statistics(0)
                     
                     # Extract goals from the most recent match
+                    self.deadline.check()
                     self.goals = self.extract_goals(0)
                     
+                    # A watchdog close mid-step leaves partial data behind; do not pass it off as a success
+                    self.deadline.check()
+                    outcome = 'success'
                     return self.to_json()
                 else:
+                    self.deadline.check()
                     self.log("No match cards found. Scraping limited.", 'warning')
                     return {'status': 'error', 'message': 'No match data found'}
             else:
+                self.deadline.check()
                 self.log("Invalid tracker ID or page did not load properly.", 'error')
                 return {'status': 'error', 'message': 'Invalid tracker ID or page did not load'}
         except Exception as e:
+            aborted = self._aborted(e)
+            if aborted is not None:
+                outcome = aborted.reason
+                self.log(f"Scrape stopped in phase {self._phase}: {str(aborted)}", 'error')
+                return {'status': 'error', 'message': str(aborted), aborted.reason: True}
             self.log(f"Scraping error: {str(e)}", 'error')
             return {'status': 'error', 'message': str(e)}
         finally:
-            self.driver.quit()
+            self._finished.set()
+            self.end_phase(outcome)
+            self.close()
+
+    def _aborted(self, error):
+        """
+        The ScrapeAborted behind an error, if any
+
+        Driver calls failing because the watchdog closed the browser surface as ordinary
+        WebDriver errors; the deadline tells them apart.
+        """
+        if isinstance(error, ScrapeAborted):
+            return error
+        try:
+            self.deadline.check()
+        except ScrapeAborted as aborted:
+            return aborted
+        return None
     
     def to_json(self):
         """Convert scraped data to JSON-friendly dictionary"""
@@ -556,21 +788,85 @@ class TrackerScraper:
         return result
 
 
-def get_team_data(team_id, headless=False, logging_level='minimal'):
+def use_shared_throttle(rate_limiter, circuit):
+    """
+    Replace the process-local rate limiter and circuit breaker
+
+    Used by scrape_worker.py with ones kept in the scrape broker, so several worker processes
+    together stay within one limit and trip one breaker.
+    """
+    global tracker_rate_limiter, tracker_circuit
+    tracker_rate_limiter = rate_limiter
+    tracker_circuit = circuit
+
+
+def get_team_data(team_id, headless=False, logging_level='minimal', progress_callback=None,
+                  deadline=SCRAPE_DEADLINE, cancel_event=None):
     """
     Convenience function to get team data in a single call
     
     :param team_id: 8-character DLL Tracker ID
     :param headless: Whether to run browser in headless mode
     :param logging_level: 'minimal', 'standard', or 'verbose'
+    :param progress_callback: Optional callable invoked with the name of each scrape phase
+    :param deadline: Seconds the whole call may take, rate limit wait included
+    :param cancel_event: Optional threading.Event set by the caller to stop the scrape early
     :return: JSON-friendly dictionary with team data
     """
+    if not isinstance(team_id, str) or not re.match(r'^[a-z0-9]{8}$', team_id.lower()):
+        # Checked before the breaker and the rate limit: bad input says nothing about the site and
+        # must not spend a token or count as a failure, or junk IDs could open the circuit for everyone
+        SCRAPE_PHASE_SECONDS.observe(0, phase='total', outcome='invalid_id')
+        return {'status': 'error', 'message': 'Invalid ID: Must be 8 characters (letters and numbers)',
+                'invalid_id': True}
+
+    budget = ScrapeDeadline(deadline, cancel_event)
+    if not tracker_circuit.allow():
+        # Fail fast instead of launching a browser against a site that keeps failing
+        SCRAPE_PHASE_SECONDS.observe(0, phase='total', outcome='circuit_open')
+        return {'status': 'error', 'message': 'Tracker is temporarily unavailable', 'circuit': tracker_circuit.state}
+
+    wait_started = time.perf_counter()
+    acquired = tracker_rate_limiter.acquire(timeout=max(0, min(RATE_LIMIT_WAIT, budget.remaining())))
+    SCRAPE_PHASE_SECONDS.observe(time.perf_counter() - wait_started, phase='rate_limit_wait',
+                                 outcome='ok' if acquired else 'throttled')
+    if not acquired:
+        # Being throttled says nothing about the site's health, so no success or failure is recorded
+        tracker_circuit.release()
+        return {'status': 'error', 'message': 'Tracker rate limit exceeded, try again shortly', 'throttled': True}
+
+    scraper = None
+    started = time.perf_counter()
     try:
-        scraper = TrackerScraper(team_id, headless=headless, logging_level=logging_level)
-        return scraper.scrape()
+        budget.check()
+        scraper = TrackerScraper(team_id, headless=headless, logging_level=logging_level,
+                                 progress_callback=progress_callback, deadline=budget)
+        result = scraper.scrape()
+    except ScrapeAborted as e:
+        result = {'status': 'error', 'message': str(e), e.reason: True}
     except Exception as e:
-        logging.error(f"Error in get_team_data: {str(e)}")
-        return {'status': 'error', 'message': str(e)}
+        logger.error(f"Error in get_team_data: {str(e)}", extra={'fields': {'team_id': team_id}})
+        result = {'status': 'error', 'message': str(e)}
+
+    # A page that loads, even for an unknown ID, means the tracker is healthy
+    if result.get('status') == 'success' or (scraper is not None and scraper.invalid_id):
+        tracker_circuit.record_success()
+    elif result.get('cancelled'):
+        # The caller gave up, which says nothing about the site
+        tracker_circuit.release()
+    else:
+        tracker_circuit.record_failure()
+
+    if result.get('status') == 'success':
+        outcome = 'success'
+    elif scraper is not None and scraper.invalid_id:
+        outcome = 'invalid_id'
+    elif result.get('deadline') or result.get('cancelled'):
+        outcome = 'deadline' if result.get('deadline') else 'cancelled'
+    else:
+        outcome = 'error'
+    SCRAPE_PHASE_SECONDS.observe(time.perf_counter() - started, phase='total', outcome=outcome)
+    return result
 
 
 if __name__ == "__main__":
@@ -1,20 +1,38 @@
 import re
 import time
 import json
-import random
-import string
-import secrets
+import queue
 from datetime import datetime
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, request, jsonify, render_template, redirect, Response, stream_with_context, g, has_request_context
 from flask_cors import CORS
-import threading
 import traceback
+import uuid
+import logging
 import requests
 from flask_jwt_extended import JWTManager, create_access_token, get_jwt_identity, jwt_required, verify_jwt_in_request
 import os
+import sys
 from flask_jwt_extended.exceptions import JWTExtendedException
 # Import the optimized tracker functions
-from Tracker import get_team_data
+from Tracker import get_team_data, tracker_circuit, tracker_rate_limiter
+from supabase_client import SupabaseClient, SUPABASE_LATENCY
+from fanout import fan_out, run_in_background
+from supabase_jwt import SupabaseTokenVerifier, NoMatchingKey, user_from_claims
+from profile_cache import ProfileCache
+from events import EventBroker, format_sse
+from scrape_pool import ScrapePool, SCRAPE_QUEUE_WAIT, MATCH_RESOLUTION, BACKGROUND
+from job_queue import RemoteScrapePool, open_broker
+from team_cache import TeamCache
+from http_cache import conditional_json, snapshot_response, json_bytes_response, not_modified
+from match_registry import MatchRegistry, MatchLookupError
+from match_resolver import MatchResolver, is_tracker_id
+from metrics import REGISTRY, Counter, Histogram, CallbackGauge
+from refresh_scheduler import RefreshScheduler
+from match_history import MatchHistory, PLATFORM_SIDE, parse_played_at
+from leaderboard import Leaderboard
+from ratings import RatingEngine
+from head_to_head import HeadToHeadIndex, RECENT_MATCHES
+from structured_logging import setup_logging
 
 app = Flask(__name__)
 app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'Z9qilGEJQpAvFdby6C5sVGeChCwLjdFUYxVtII0qpXw4GTtPwhb7QbRzwd4qqmIcdQ5Nm1YQIz6xtcT4gQRbLQ==')
@@ -37,42 +55,140 @@ CORS(app,
 
 jwt = JWTManager(app)
 
+logger = logging.getLogger('api')
+
+# Fraction of INFO/DEBUG log records kept per route; warnings and errors are always kept
+LOG_SAMPLE_RATES = {
+    '/protected': 0.05,
+    '/team-info': 0.1,
+    '/user/stats': 0.1,
+    '/login': 0.5
+}
+
+
+def log_context():
+    """Request ID and route of the current request, for the log pipeline"""
+    if not has_request_context():
+        return None, None
+    route = request.url_rule.rule if request.url_rule else None
+    return g.get('request_id'), route
+
+
+# Tracker and API records share one queue-backed JSON pipeline on stdout and tracker.log
+# LOG_FILE='' turns the file off; LOG_STREAM=stderr keeps stdout free for tools that wrap the app
+log_listener = setup_logging(
+    log_context,
+    route_rates=LOG_SAMPLE_RATES,
+    log_file=os.environ.get('LOG_FILE', 'tracker.log') or None,
+    stream=sys.stderr if os.environ.get('LOG_STREAM') == 'stderr' else sys.stdout
+)
+
+REQUEST_LATENCY = Histogram(
+    'http_request_seconds',
+    'Time to build a response, by route; streaming routes measure time to the first byte',
+    labelnames=('route', 'method', 'status')
+)
+TEAM_CACHE_REQUESTS = Counter(
+    'team_cache_requests_total',
+    'Team data lookups by result (hit, miss or stale)',
+    labelnames=('result',)
+)
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    # Reuse an upstream proxy's request ID so log lines can be joined across services
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+
+
+@app.after_request
+def record_request_latency(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        # Label by URL rule rather than path so IDs in query strings do not explode cardinality
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_LATENCY.observe(time.perf_counter() - started,
+                                route=route, method=request.method, status=response.status_code)
+    if 'request_id' in g:
+        response.headers['X-Request-ID'] = g.request_id
+    return response
+
 
 # Add this to handle failed token verification
 @jwt.unauthorized_loader
 def unauthorized_callback(error):
-    print("Missing token:", error)
+    logger.info("Missing token", extra={"fields": {"reason": str(error)}})
     return jsonify({"error": "Unauthorized access - No valid token provided"}), 401
 
 @jwt.invalid_token_loader
 def invalid_token_callback(error):
-    print("Invalid token:", error)
+    logger.info("Invalid token", extra={"fields": {"reason": str(error)}})
     return jsonify({"error": "Invalid token"}), 401
 
 @jwt.expired_token_loader
 def expired_token_callback(jwt_header, jwt_payload):
-    print("Token has expired:", jwt_payload)
+    logger.info("Token has expired", extra={"fields": {"user_id": jwt_payload.get("sub")}})
     return jsonify({"error": "Token has expired"}), 401
 
 
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-SUPABASE_AUTH_URL = f"{SUPABASE_URL}/auth/v1/user"
+# Pooled client shared by every route that talks to Supabase
+supabase = SupabaseClient(SUPABASE_URL, SUPABASE_KEY)
+
+# Verifies Supabase access tokens locally using the project secret or the published JWKS
+token_verifier = SupabaseTokenVerifier(supabase, jwt_secret=os.getenv("SUPABASE_JWT_SECRET"))
+token_verifier.start()
+
+def verify_jwt(token, remote=False):
+    """
+    Validate a Supabase access token and return the user it belongs to
 
-def verify_jwt(token):
-    headers = {"Authorization": f"Bearer {token}", "apikey": SUPABASE_KEY}
-    response = requests.get(SUPABASE_AUTH_URL, headers=headers)
+    Tokens are checked locally by default and rejected locally only for a bad signature or
+    bad claims; a token signed with a key we do not hold is checked with Supabase. Pass
+    remote=True on revocation-sensitive routes to also confirm that the session is still live.
+    """
+    if not remote and token_verifier.enabled:
+        try:
+            claims = token_verifier.verify(token)
+            return user_from_claims(claims) if claims else None
+        except NoMatchingKey as e:
+            logger.debug(f"Checking token with Supabase: {str(e)}")
+
+    try:
+        response = supabase.get("/auth/v1/user", headers={"Authorization": f"Bearer {token}"})
+    except requests.RequestException as e:
+        logger.warning(f"Supabase token check failed: {str(e)}")
+        return None
     return response.json() if response.status_code == 200 else None
 
+def load_profile(user_id):
+    """Fetch a user's row from the profiles table, None if it does not exist"""
+    response = supabase.get(
+        f"/rest/v1/profiles?id=eq.{user_id}&select=*",
+        headers=supabase.service_headers()
+    )
+    if response.status_code != 200 or not response.json():
+        return None
+    return response.json()[0]
+
+# Short-lived profile cache shared by /protected and /user/stats
+profile_cache = ProfileCache(load_profile, ttl=30)
+
+def invalidate_profile(user_id):
+    """Call after registration, balance or stat changes so the next read sees fresh data"""
+    profile_cache.invalidate(user_id)
+
 @jwt.token_verification_failed_loader
 def token_verification_failed_callback(jwt_header, jwt_payload):
-    print("Token verification failed")
+    logger.info("Token verification failed")
     return jsonify({"error": "Token verification failed"}), 401
 
 @app.errorhandler(JWTExtendedException)
 def handle_jwt_exceptions(error):
-    print(f"JWT Exception: {str(error)}")
+    logger.info(f"JWT exception: {str(error)}")
     return jsonify({"error": str(error)}), 401
 
 @app.route('/register', methods=['POST'])
@@ -81,7 +197,7 @@ def register():
     try:
         # Get JSON data
         data = request.json
-        print("Registration data received:", data)  # Debugging
+        logger.info("Registration request", extra={"fields": {"email": (data or {}).get("email"), "team_id": (data or {}).get("team_id")}})
         
         # Extract required fields
         email = data.get("email")
@@ -104,10 +220,10 @@ def register():
             return jsonify({"error": "Team ID must be 8 alphanumeric characters"}), 400
 
         # Register user with Supabase Auth
-        response = requests.post(f"{SUPABASE_URL}/auth/v1/signup", json={
+        response = supabase.post("/auth/v1/signup", json={
             "email": email,
             "password": password
-        }, headers={"apikey": SUPABASE_KEY})
+        })
 
         if response.status_code == 400:
             # User might already exist
@@ -115,39 +231,40 @@ def register():
             return jsonify({"error": error_msg}), 400
         
         if response.status_code != 200:
-            print("Supabase signup error:", response.text)  # Debugging
+            logger.warning("Supabase signup error", extra={"fields": {"status": response.status_code}})
             return jsonify({"error": "Registration failed"}), 400
 
         user_id = response.json().get("id")  # Get user ID
         if not user_id:
-            print("No user ID in response:", response.json())  # Debugging
+            logger.error("No user ID in signup response")
             return jsonify({"error": "Failed to create user account"}), 500
 
         # Create a profile in `profiles` table - use first_name instead of full_name
-        profile_response = requests.post(
-            f"{SUPABASE_URL}/rest/v1/profiles", 
+        profile_response = supabase.post(
+            "/rest/v1/profiles", 
             json={
                 "id": user_id,
                 "first_name": full_name,  # Changed to first_name to match the database schema
                 "team_id": team_id
             }, 
-            headers={
-                "apikey": SUPABASE_KEY, 
-                "Authorization": f"Bearer {SUPABASE_KEY}",
+            headers=supabase.service_headers({
                 "Content-Type": "application/json",
                 "Prefer": "return=minimal"
-            }
+            })
         )
         
         if profile_response.status_code not in [200, 201]:
-            print("Profile creation error:", profile_response.text)  # Debugging
+            logger.error("Profile creation error", extra={"fields": {"status": profile_response.status_code}})
             # Clean up the user if profile creation fails
-            requests.delete(
-                f"{SUPABASE_URL}/auth/v1/user/{user_id}",
-                headers={"apikey": SUPABASE_KEY, "Authorization": f"Bearer {SUPABASE_KEY}"}
+            supabase.delete(
+                f"/auth/v1/user/{user_id}",
+                headers=supabase.service_headers()
             )
             return jsonify({"error": "Failed to create user profile"}), 500
 
+        # Drop anything cached for this ID before the user's first page load
+        invalidate_profile(user_id)
+
         # Check if confirmation email is required
         requires_confirmation = response.json().get("confirmation_sent_at") is not None
 
@@ -158,8 +275,7 @@ def register():
         }), 201
     
     except Exception as e:
-        print(f"Registration error: {str(e)}")
-        print(traceback.format_exc())  # Print full traceback
+        logger.exception(f"Registration error: {str(e)}")
         return jsonify({"error": "An unexpected error occurred"}), 500
 
 @app.route('/login', methods=['POST'])
@@ -170,47 +286,39 @@ def login():
         email = data.get("email")
         password = data.get("password")
 
-        print(f"Login attempt for {email}")
-
         if not email or not password:
             return jsonify({"error": "Email and password are required"}), 400
 
         # Authenticate with Supabase
-        response = requests.post(
-            f"{SUPABASE_URL}/auth/v1/token?grant_type=password", 
+        response = supabase.post(
+            "/auth/v1/token?grant_type=password", 
             json={
                 "email": email,
                 "password": password
-            }, 
-            headers={"apikey": SUPABASE_KEY}
+            }
         )
 
-        print(f"Supabase response: {response.status_code}")
-        
         if response.status_code != 200:
-            # Log the error for debugging
-            error_data = response.json() if response.text else "No response data"
-            print(f"Login failed: {error_data}")
+            logger.info("Login failed", extra={"fields": {"status": response.status_code}})
             return jsonify({"error": "Invalid credentials"}), 401
 
         # Parse the response
         user_data = response.json()
-        print(f"User authenticated successfully: {user_data.get('user', {}).get('id')}")
-        
         user_id = user_data.get("user", {}).get("id")
         if not user_id:
-            print("No user ID found in response")
+            logger.error("No user ID in Supabase token response")
             return jsonify({"error": "Authentication error"}), 500
 
         # Create an access token with the user_id
-        access_token = create_access_token(identity=user_id)
+        # Carry the email in our own token so /protected does not need to ask Supabase for it
+        access_token = create_access_token(
+            identity=user_id,
+            additional_claims={"email": user_data.get("user", {}).get("email")}
+        )
         
         # Create a response
         resp = jsonify({"success": True, "message": "Login successful"})
         
-        # Log the token for debugging
-        print(f"Generated JWT token (first 20 chars): {access_token[:20]}...")
-        
         # Set the JWT as a cookie with explicit parameters
         max_age = 60*60*24*7  # 7 days
         resp.set_cookie(
@@ -223,18 +331,35 @@ def login():
             path="/"
         )
         
-        print(f"Login successful, token set for user {user_id}")
-        print(f"Response headers: {dict(resp.headers)}")
+        logger.info("Login successful", extra={"fields": {"user_id": user_id}})
+
+        # Warm the profile and team data the dashboard will ask for next
+        schedule_prefetch(user_id)
         return resp
         
     except Exception as e:
-        print(f"Login error: {str(e)}")
-        print(traceback.format_exc())  # Print full traceback
+        logger.exception(f"Login error: {str(e)}")
         return jsonify({"error": "An unexpected error occurred"}), 500
 # In-memory storage for matches
-matches = {}
-active_scrapes = {}
-team_data_cache = {}
+matches = MatchRegistry()
+# Latest versioned scrape result per team
+team_cache = TeamCache()
+# Every match seen in a scrape, kept long after the card drops off the tracker page
+match_history = MatchHistory(os.environ.get('MATCH_HISTORY_DIR'))
+# Team ranking updated as scrapes and match results come in
+leaderboard = Leaderboard()
+# Elo ratings by team name, updated as matches are scraped or resolved
+rating_engine = RatingEngine(os.environ.get('RATINGS_FILE'))
+if not rating_engine.restored and match_history.stats()['matches']:
+    # No saved rating state, rebuild it from the recorded matches
+    rating_engine.recompute(match_history.export())
+# Record between every pair of teams that have met, rebuilt from the recorded matches
+head_to_head = HeadToHeadIndex()
+head_to_head.rebuild(match_history.export())
+# Subscribers waiting on a team scrape, keyed by team ID
+team_events = EventBroker()
+# Subscribers waiting on a match result, keyed by match code
+match_events = EventBroker()
 
 # Add a logout route
 @app.route('/logout', methods=['POST'])
@@ -249,14 +374,8 @@ def protected():
         # Manually extract and verify JWT token from cookies
         token = request.cookies.get('access_token')
         
-        # Log information about the request
-        print(f"Protected route accessed")
-        print(f"Request headers: {dict(request.headers)}")
-        print(f"Request cookies: {dict(request.cookies)}")
-        print(f"Access token present: {token is not None}")
-        
         if not token:
-            print("No access token in cookies")
+            logger.info("No access token in cookies")
             return jsonify({"error": "Unauthorized access - No token"}), 401
         
         try:
@@ -264,47 +383,39 @@ def protected():
             from flask_jwt_extended import decode_token, get_jwt_identity
             decoded_token = decode_token(token)
             user_id = decoded_token.get('sub')  # 'sub' is where the identity is stored
-            
-            print(f"Token successfully decoded, user_id: {user_id}")
+
         except Exception as e:
-            print(f"Token verification failed: {str(e)}")
+            logger.info(f"Token verification failed: {str(e)}")
             return jsonify({"error": f"Invalid token: {str(e)}"}), 401
         
         # Token is valid, get user data from Supabase
-        headers = {
-            "apikey": SUPABASE_KEY,
-            "Authorization": f"Bearer {SUPABASE_KEY}"
-        }
+        headers = supabase.service_headers()
         
-        # Get user profile
-        profile_response = requests.get(
-            f"{SUPABASE_URL}/rest/v1/profiles?id=eq.{user_id}&select=*",
-            headers=headers
-        )
-        
-        if profile_response.status_code != 200 or not profile_response.json():
-            print(f"User profile not found for ID: {user_id}")
-            return jsonify({"error": "User not found"}), 404
-            
-        profile = profile_response.json()[0]
-        print(f"Retrieved profile: {profile}")
+        # Tokens issued at login carry the email; older tokens still need the auth lookup
+        email = decoded_token.get('email')
+        calls = [lambda: profile_cache.get(user_id)]
+        if not email:
+            calls.append(lambda: supabase.get(f"/auth/v1/user/{user_id}", headers=headers))
         
-        # Get user auth data
-        auth_response = requests.get(
-            f"{SUPABASE_URL}/auth/v1/user/{user_id}",
-            headers=headers
-        )
+        # Profile and auth data are independent, fetch them concurrently
+        results = fan_out(*calls)
+        profile = results[0]
         
-        if auth_response.status_code != 200:
-            print(f"Failed to get auth data: {auth_response.status_code}")
-            return jsonify({"error": "Could not retrieve user data"}), 500
+        if not profile:
+            logger.info("User profile not found", extra={"fields": {"user_id": user_id}})
+            return jsonify({"error": "User not found"}), 404
             
-        auth_data = auth_response.json()
+        if not email:
+            auth_response = results[1]
+            if auth_response.status_code != 200:
+                logger.warning("Failed to get auth data", extra={"fields": {"status": auth_response.status_code}})
+                return jsonify({"error": "Could not retrieve user data"}), 500
+            email = auth_response.json().get("email")
         
         # Combine the data with all available profile fields
         user_data = {
             "id": user_id,
-            "email": auth_data.get("email"),
+            "email": email,
             "full_name": profile.get("first_name"),  # Map first_name to full_name for frontend
             "team_id": profile.get("team_id"),
             "balance": profile.get("balance", 0),
@@ -312,11 +423,10 @@ def protected():
             # Add any other fields you need from the profile
         }
         
-        print(f"Returning user data: {user_data}")
+        logger.debug("Returning user data", extra={"fields": {"user_id": user_id}})
         return jsonify(user_data)
     except Exception as e:
-        print(f"Protected route error: {str(e)}")
-        print(traceback.format_exc())  # Print full traceback
+        logger.exception(f"Protected route error: {str(e)}")
         return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
 
 @app.route('/confirm', methods=['GET'])
@@ -331,24 +441,29 @@ def confirm_email():
     
     try:
         # Confirm the user with Supabase
-        response = requests.post(
-            f"{SUPABASE_URL}/auth/v1/verify", 
+        response = supabase.post(
+            "/auth/v1/verify", 
             json={
                 "type": "signup",
                 "token": token_hash
-            },
-            headers={"apikey": SUPABASE_KEY}
+            }
         )
         
         if response.status_code != 200:
-            print("Email confirmation error:", response.text)
+            logger.warning("Email confirmation error", extra={"fields": {"status": response.status_code}})
             return redirect(f"{os.environ.get('NEXT_PUBLIC_FRONTEND_URL', 'http://localhost:3000')}/login?error=confirmation_failed")
             
         # Get user data from response
         user_data = response.json()
         
         # Create access token for the user
-        access_token = create_access_token(identity=user_data.get('id'))
+        access_token = create_access_token(
+            identity=user_data.get('id'),
+            additional_claims={"email": user_data.get('email')}
+        )
+        
+        # Warm the profile and team data the dashboard will ask for next
+        schedule_prefetch(user_data.get('id'))
         
         # Redirect to frontend with cookie
         resp = redirect(f"{os.environ.get('NEXT_PUBLIC_FRONTEND_URL', 'http://localhost:3000')}/")
@@ -366,34 +481,41 @@ def confirm_email():
         return resp
         
     except Exception as e:
-        print(f"Confirmation error: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception(f"Confirmation error: {str(e)}")
         return redirect(f"{os.environ.get('NEXT_PUBLIC_FRONTEND_URL', 'http://localhost:3000')}/login?error=confirmation_failed")
 
+def prefetch_user_team(user_id):
+    """Load a user's profile into the cache and queue a scrape of their team if it is cold"""
+    try:
+        profile = profile_cache.get(user_id)
+        team_id = (profile or {}).get("team_id")
+        if not team_id or not re.match(r'^[a-z0-9]{8}$', str(team_id).lower()):
+            return
+        if team_cache.get_fresh(team_id, TEAM_CACHE_TTL) is None:
+            # Speculative, so it must not hold up users already waiting on a scrape
+            scrape_pool.submit(team_id, priority=BACKGROUND)
+        refresh_scheduler.record_request(team_id)
+    except Exception as e:
+        logger.warning(f"Prefetch failed: {str(e)}", extra={"fields": {"user_id": user_id}})
+
+def schedule_prefetch(user_id):
+    """Run prefetch_user_team off the request thread so login latency is unchanged"""
+    if user_id:
+        run_in_background(lambda: prefetch_user_team(user_id))
+
 @app.route('/user/stats', methods=['GET'])
 @jwt_required(locations = ["cookies"])
 def user_stats():
     try:
         # Get the user identity from the JWT
         user_id = get_jwt_identity()
-        print(f"Fetching stats for user: {user_id}")
-        
-        # Get user data from Supabase
-        headers = {
-            "apikey": SUPABASE_KEY,
-            "Authorization": f"Bearer {SUPABASE_KEY}"
-        }
+        logger.debug("Fetching stats", extra={"fields": {"user_id": user_id}})
         
         # Get user profile
-        profile_response = requests.get(
-            f"{SUPABASE_URL}/rest/v1/profiles?id=eq.{user_id}&select=*",
-            headers=headers
-        )
+        profile = profile_cache.get(user_id)
         
-        if profile_response.status_code != 200 or not profile_response.json():
+        if not profile:
             return jsonify({"error": "User not found"}), 404
-            
-        profile = profile_response.json()[0]
         
         # You can fetch additional data from other tables if needed
         
@@ -409,10 +531,14 @@ def user_stats():
             "recent_form": profile.get("form", "")
         }
         
+        # Full-history aggregates for the user's team, once any of its matches have been scraped
+        if profile.get("team_id"):
+            stats["history"] = match_history.team_stats(profile["team_id"])
+            stats["open_matches"] = sorted(matches.for_player(profile["team_id"], open_only=True))
+        
         return jsonify(stats)
     except Exception as e:
-        print(f"User stats error: {str(e)}")
-        print(traceback.format_exc())  # Print full traceback
+        logger.exception(f"User stats error: {str(e)}")
         return jsonify({"error": "An unexpected error occurred"}), 500
 
 def calculate_win_percentage(profile):
@@ -425,60 +551,184 @@ def calculate_win_percentage(profile):
     
     return round((wins / matches_played) * 100)
 
-def generate_match_code():
-    """Generate a unique match code in the format ARN + 3 random numbers"""
-    random_numbers = ''.join(random.choices(string.digits, k=3))
-    return f"ARN{random_numbers}"
+# Team data older than this is refreshed on the next request
+TEAM_CACHE_TTL = 300
+# After a failed scrape, requests get the failure (or stale data) for this long before retrying
+FAILED_SCRAPE_TTL = 30
+# Whether Chrome runs headless for background scrapes
+SCRAPE_HEADLESS = os.environ.get('SCRAPE_HEADLESS', 'false').lower() == 'true'
+# Seconds one scrape may hold a pool worker and its Chrome before it is abandoned
+SCRAPE_DEADLINE = int(os.environ.get('SCRAPE_DEADLINE', 60))
+
+def get_cached_team_data(team_id):
+    """Return cached team data if it is still fresh, otherwise None"""
+    # Check if cache is less than 5 minutes old
+    snapshot = team_cache.get_fresh(team_id, TEAM_CACHE_TTL)
+    if snapshot is None:
+        TEAM_CACHE_REQUESTS.inc(result='miss')
+        return None
+    TEAM_CACHE_REQUESTS.inc(result='hit')
+    return snapshot.data
+
+def stale_team_data(snapshot):
+    """Expired team data marked as stale, served while the tracker is unavailable"""
+    return dict(snapshot.data, stale=True, fetched_at=snapshot.fetched_at.isoformat(),
+                circuit=tracker_circuit.state)
+
+def team_data_response(team_id, result, since=None):
+    """
+    Send team data, reusing the snapshot's encoded bytes when it came from the cache
 
-def generate_secure_token():
-    """Generate a secure 16 character token"""
-    return ''.join(secrets.choice(string.ascii_letters + string.digits) for _ in range(16))
+    With since, a client holding that version gets only what changed; versions no longer
+    retained, or that cannot be compared, get the full snapshot as a resync.
+    """
+    snapshot = team_cache.get(team_id)
+    if snapshot is None or snapshot.data is not result:
+        return conditional_json(result)
+
+    if since is not None:
+        previous = team_cache.get_version(team_id, since)
+        body = snapshot.delta_body(previous) if previous is not None else None
+        if body is not None:
+            etag = snapshot.delta_etag(since)
+            if not_modified(etag):
+                response = Response(status=304)
+                response.set_etag(etag)
+            else:
+                response = json_bytes_response(body, etag=etag)
+            response.headers['X-Team-Version'] = snapshot.version
+            return response
+
+    response = snapshot_response(snapshot)
+    response.headers['X-Team-Version'] = snapshot.version
+    return response
+
+def scrape_team_data(team_id):
+    """Scrape a team on a pool worker, cache the result and notify subscribers"""
+    def report_progress(phase):
+        team_events.publish(team_id, "progress", {"status": "pending", "phase": phase})
+
+    try:
+        # Use the improved API-friendly function
+        result = get_team_data(team_id, headless=SCRAPE_HEADLESS, logging_level='minimal',
+                               progress_callback=report_progress, deadline=SCRAPE_DEADLINE)
+    except Exception as e:
+        logger.exception(f"Error in scrape thread: {str(e)}", extra={"fields": {"team_id": team_id}})
+        # Store error in cache
+        result = {"status": "error", "message": str(e)}
 
-def get_team_data_async(team_id, headless=False):  # Changed default to False
+    store_team_result(team_id, result)
+
+def store_team_result(team_id, result, fetched_at=None):
+    """
+    Cache a scrape result, from a local pool worker or a remote one, and notify subscribers
+
+    Only a successful scrape replaces the team's snapshot. A failed one is remembered for
+    FAILED_SCRAPE_TTL so requests do not queue a new scrape each time, while the last good
+    snapshot keeps being served as stale. Circuit breaker and rate limiter refusals, and scrapes
+    cancelled because another worker took over, are not cached at all since no scrape ran.
+    """
+    previous = team_cache.get(team_id)
+    if result.get("status") != "success":
+        if not (result.get('circuit') or result.get('throttled') or result.get('cancelled')):
+            failure = team_cache.put_failure(team_id, result, fetched_at)
+            refresh_scheduler.on_snapshot(team_id, previous, failure)
+        team_events.publish(team_id, "complete", stale_team_data(previous) if previous is not None else result)
+        return
+
+    # Update cache with timestamp
+    snapshot = team_cache.put(team_id, result, fetched_at)
+    refresh_scheduler.on_snapshot(team_id, previous, snapshot)
+    ingest_scrape(team_id, result)
+
+    # Wake up anyone streaming or long-polling this team
+    team_events.publish(team_id, "complete", result)
+
+def ingest_scrape(team_id, result):
+    """Feed a scrape result to the long-term match history and the leaderboard"""
+    if result.get("status") != "success":
+        return
+    leaderboard.update_team(team_id, result.get("team_name"), result.get("team_stats", {}).get("win_percentage"))
+    try:
+        added = match_history.ingest(team_id, result)
+    except Exception as e:
+        logger.exception(f"Match history ingest failed: {str(e)}", extra={"fields": {"team_id": team_id}})
+        return
+    if added:
+        logger.debug("Recorded new matches", extra={"fields": {"team_id": team_id, "count": len(added)}})
+        rating_engine.ingest(added)
+        head_to_head.ingest(added)
+
+def store_remote_result(team_id, result, fetched_at):
+    """Take in a result written to the shared store by a scrape_worker.py process"""
+    store_team_result(team_id, result, datetime.fromtimestamp(fetched_at))
+
+SCRAPE_BROKER = os.environ.get('SCRAPE_BROKER')
+if SCRAPE_BROKER:
+    # Scrapes run in separate scrape_worker.py processes; this node only queues jobs and reads results
+    scrape_broker = open_broker(SCRAPE_BROKER)
+    scrape_pool = RemoteScrapePool(scrape_broker, store_remote_result)
+    # Read the workers' shared limiter and breaker so /status and stale serving see their real state
+    tracker_rate_limiter = scrape_broker.rate_limiter('tracker', tracker_rate_limiter.rate, tracker_rate_limiter.capacity)
+    tracker_circuit = scrape_broker.circuit_breaker('tracker', tracker_circuit.failure_threshold,
+                                                    tracker_circuit.reset_timeout)
+else:
+    # Bounded pool so a burst of requests cannot launch unlimited Chrome instances
+    scrape_pool = ScrapePool(scrape_team_data, workers=int(os.environ.get('SCRAPE_WORKERS', 3)))
+scrape_pool.start()
+
+CallbackGauge('scrape_queue_depth', 'Scrapes waiting for a worker, by priority class',
+              lambda: {(priority,): count for priority, count in scrape_pool.stats()['queued_by_priority'].items()},
+              labelnames=('priority',))
+CallbackGauge('scrape_running', 'Scrapes currently running, by priority class',
+              lambda: {(priority,): count for priority, count in scrape_pool.stats()['running_by_priority'].items()},
+              labelnames=('priority',))
+CallbackGauge('team_cache_entries', 'Teams with a cached snapshot', lambda: len(team_cache))
+
+def get_team_data_async(team_id):
     """Get team data asynchronously and cache it"""
-    if team_id in team_data_cache:
-        # Check if cache is less than 5 minutes old
-        cache_time, data = team_data_cache[team_id]
-        if (datetime.now() - cache_time).seconds < 300:  # 5 minutes cache
-            return data
+    data = get_cached_team_data(team_id)
+    if data is not None:
+        return data
+    
+    # Right after a failed scrape, serve the last good data or the failure instead of retrying at once
+    failure = team_cache.get_failure(team_id, FAILED_SCRAPE_TTL)
+    if failure is not None:
+        snapshot = team_cache.get(team_id)
+        if snapshot is not None:
+            TEAM_CACHE_REQUESTS.inc(result='stale')
+            return stale_team_data(snapshot)
+        return failure.data
+
+    # While the tracker is failing, serve stale data or fail fast instead of queueing doomed scrapes
+    if tracker_circuit.state == 'open':
+        snapshot = team_cache.get(team_id)
+        if snapshot is not None:
+            TEAM_CACHE_REQUESTS.inc(result='stale')
+            return stale_team_data(snapshot)
+        return {"status": "error", "message": "Tracker is temporarily unavailable", "circuit": tracker_circuit.stats()}
     
     # Cache is expired or doesn't exist, fetch new data
     try:
         # Run the scraper in background if not already running
-        if team_id in active_scrapes:
-            # Check if scraping thread is still alive
-            if active_scrapes[team_id].is_alive():
-                return {"status": "pending", "message": "Data is being fetched"}
-            else:
-                # Thread has completed but data is not in cache
-                del active_scrapes[team_id]
-        
-        # Start a new scraping thread
-        def scrape_team_data():
-            try:
-                # Use the improved API-friendly function with headless=False
-                result = get_team_data(team_id, headless=headless, logging_level='minimal')
-                
-                # Update cache with timestamp
-                team_data_cache[team_id] = (datetime.now(), result)
-            except Exception as e:
-                print(f"Error in scrape thread: {str(e)}")
-                print(traceback.format_exc())
-                # Store error in cache
-                team_data_cache[team_id] = (datetime.now(), {"status": "error", "message": str(e)})
-        
-        # Start the thread and track it
-        scrape_thread = threading.Thread(target=scrape_team_data)
-        scrape_thread.daemon = True
-        scrape_thread.start()
-        active_scrapes[team_id] = scrape_thread
+        if not scrape_pool.submit(team_id):
+            return {"status": "pending", "message": "Data is being fetched"}
         
         return {"status": "pending", "message": "Data fetch started"}
         
     except Exception as e:
-        print(f"Error getting team data: {str(e)}")
+        logger.error(f"Error getting team data: {str(e)}")
         return {"status": "error", "message": str(e)}
 
+# Limits for the batch, long-poll and streaming variants of /team-info
+MAX_BATCH_TEAM_IDS = 50
+MAX_TEAM_INFO_WAIT = 60
+TEAM_STREAM_TIMEOUT = 120
+SSE_KEEPALIVE_INTERVAL = 15
+# Match streams end after this long and the browser reconnects on its own
+MATCH_STREAM_TIMEOUT = 600
+MATCH_STREAM_RETRY_MS = 5000
+
 # Add a home page with a simple UI
 @app.route('/')
 def home():
@@ -496,22 +746,16 @@ def create_match():
             if field not in data:
                 return jsonify({"status": "error", "message": f"Missing required field: {field}"}), 400
         
-        # Generate match code and secure token
-        match_code = generate_match_code()
-        secure_token = generate_secure_token()
-        full_code = f"{match_code}@[{secure_token}]"
-        
-        # Store match data
-        matches[match_code] = {
-            "player_1": data['player_1'],
-            "player_2": data['player_2'],
-            "team_A": data['team_A'],
-            "team_B": data['team_B'],
-            "created_at": datetime.now().isoformat(),
-            "result_fetched": False,
-            "match_data": None,
-            "secure_token": secure_token
-        }
+        # Players are tracker IDs; the resolver scrapes them to fill in the result
+        for field in ('player_1', 'player_2'):
+            if not is_tracker_id(data[field]):
+                return jsonify({"status": "error", "message": f"Invalid tracker ID format for {field}"}), 400
+        
+        # Register the match under a collision-free code with its secure token
+        match_code, full_code = matches.create(data['player_1'], data['player_2'], data['team_A'], data['team_B'])
+        
+        # Record both players' pre-match state so the resolver can spot the new result
+        match_resolver.track(match_code)
         
         return jsonify({
             "status": "success",
@@ -535,96 +779,483 @@ def get_team_info():
     if not re.match(r'^[a-z0-9]{8}$', team_id.lower()):
         return jsonify({"status": "error", "message": "Invalid team ID format"}), 400
     
-    # Get data using team ID
-    result = get_team_data_async(team_id)
-    return jsonify(result)
+    refresh_scheduler.record_request(team_id)
 
+    # Optional long-poll: hold the request until the scrape finishes or the wait runs out
+    try:
+        wait = min(float(request.args.get('wait', 0)), MAX_TEAM_INFO_WAIT)
+    except ValueError:
+        return jsonify({"status": "error", "message": "wait must be a number of seconds"}), 400
 
-@app.route('/match-result', methods=['GET'])
-def get_match_result():
-    """Get match result using match code"""
-    full_match_code = request.args.get('match_code')
+    # Optional delta mode: the version the client already holds, from X-Team-Version
+    since = request.args.get('since')
+    if since is not None and not re.match(r'^[0-9a-f]{16}$', since):
+        return jsonify({"status": "error", "message": "since must be a version from X-Team-Version"}), 400
+
+    if wait <= 0:
+        # Get data using team ID
+        result = get_team_data_async(team_id)
+        return team_data_response(team_id, result, since)
+
+    # Subscribe before checking the cache so a scrape finishing in between is not missed
+    subscriber = team_events.subscribe(team_id)
+    try:
+        result = get_team_data_async(team_id)
+        deadline = time.monotonic() + wait
+        while result.get("status") == "pending":
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                event, data = subscriber.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if event == "complete":
+                result = data
+    finally:
+        team_events.unsubscribe(team_id, subscriber)
+
+    return team_data_response(team_id, result, since)
+
+
+@app.route('/team-info/batch', methods=['POST'])
+def get_team_info_batch():
+    """Get team information for many team IDs in one request"""
+    data = request.json
+    if not isinstance(data, dict):
+        return jsonify({"status": "error", "message": "Request body must be a JSON object with team_ids"}), 400
+    team_ids = data.get('team_ids')
     
-    if not full_match_code:
-        return jsonify({"status": "error", "message": "Match code is required"}), 400
+    if not isinstance(team_ids, list) or not team_ids:
+        return jsonify({"status": "error", "message": "team_ids must be a non-empty list"}), 400
     
-    # Parse match code
-    try:
-        match_code, token_part = full_match_code.split('@')
-        token = token_part.strip('[]')
-    except ValueError:
-        return jsonify({"status": "error", "message": "Invalid match code format"}), 400
+    if len(team_ids) > MAX_BATCH_TEAM_IDS:
+        return jsonify({"status": "error", "message": f"At most {MAX_BATCH_TEAM_IDS} team IDs per request"}), 400
     
-    # Check if match exists
-    if match_code not in matches:
-        return jsonify({"status": "error", "message": "Match not found"}), 404
+    results = {}
+    misses = []
+    for team_id in team_ids:
+        team_id = str(team_id)
+        if team_id in results:
+            continue
+        
+        # Validate team ID format
+        if not re.match(r'^[a-z0-9]{8}$', team_id.lower()):
+            results[team_id] = {"status": "error", "message": "Invalid team ID format"}
+            continue
+        
+        refresh_scheduler.record_request(team_id)
+        cached = get_cached_team_data(team_id)
+        if cached is not None:
+            results[team_id] = cached
+        else:
+            misses.append(team_id)
+    
+    # Schedule every miss in one go; teams already being scraped are not queued twice
+    for team_id, state in scrape_pool.submit_many(misses).items():
+        message = "Data fetch started" if state == 'queued' else "Data is being fetched"
+        results[team_id] = {"status": "pending", "message": message}
+    
+    complete = not any(result.get("status") == "pending" for result in results.values())
+    return conditional_json({
+        "status": "success" if complete else "partial",
+        "pending": len(misses),
+        "results": results
+    })
+
+
+@app.route('/team-info/stream', methods=['GET'])
+def stream_team_info():
+    """Stream scrape progress and the final team data as Server-Sent Events"""
+    team_id = request.args.get('team_id')
     
-    # Verify token
-    match_data = matches[match_code]
-    if match_data['secure_token'] != token:
-        return jsonify({"status": "error", "message": "Invalid token"}), 403
+    if not team_id:
+        return jsonify({"status": "error", "message": "Team ID is required"}), 400
     
+    # Validate team ID format
+    if not re.match(r'^[a-z0-9]{8}$', team_id.lower()):
+        return jsonify({"status": "error", "message": "Invalid team ID format"}), 400
+
+    refresh_scheduler.record_request(team_id)
+    subscriber = team_events.subscribe(team_id)
+
+    def generate():
+        try:
+            result = get_team_data_async(team_id)
+            if result.get("status") != "pending":
+                yield format_sse("complete", result)
+                return
+
+            yield format_sse("progress", result)
+            deadline = time.monotonic() + TEAM_STREAM_TIMEOUT
+            while time.monotonic() < deadline:
+                try:
+                    event, data = subscriber.get(timeout=SSE_KEEPALIVE_INTERVAL)
+                except queue.Empty:
+                    # SSE comment line keeps proxies from closing an idle connection
+                    yield ": keep-alive\n\n"
+                    continue
+
+                yield format_sse(event, data)
+                if event == "complete":
+                    return
+
+            yield format_sse("timeout", {"status": "pending", "message": "Data is still being fetched"})
+        finally:
+            team_events.unsubscribe(team_id, subscriber)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def build_match_result(match_data):
+    """Build the /match-result payload for a stored match"""
     # If result already fetched, return it
     if match_data['result_fetched'] and match_data['match_data']:
-        return jsonify({
+        return {
             "status": "success",
             "home_team": match_data['team_A'],
             "away_team": match_data['team_B'],
             "match_data": match_data['match_data']
-        })
+        }
     
     # Otherwise, indicate match is still in progress
-    return jsonify({
+    return {
         "status": "pending",
         "message": "Match results not available yet",
         "home_team": match_data['team_A'],
         "away_team": match_data['team_B']
-    })
+    }
 
 
-@app.route('/match-stats', methods=['GET'])
-def get_match_stats():
-    """Get detailed match statistics using match code"""
-    full_match_code = request.args.get('match_code')
-    
-    if not full_match_code:
-        return jsonify({"status": "error", "message": "Match code is required"}), 400
-    
-    # Parse match code
-    try:
-        match_code, token_part = full_match_code.split('@')
-        token = token_part.strip('[]')
-    except ValueError:
-        return jsonify({"status": "error", "message": "Invalid match code format"}), 400
-    
-    # Check if match exists
-    if match_code not in matches:
-        return jsonify({"status": "error", "message": "Match not found"}), 404
-    
-    # Verify token
-    match_data = matches[match_code]
-    if match_data['secure_token'] != token:
-        return jsonify({"status": "error", "message": "Invalid token"}), 403
-    
+def build_match_stats(match_data):
+    """Build the /match-stats payload for a stored match"""
     # If we have match data with stats, return it
     if match_data['result_fetched'] and match_data['match_data'] and 'stats' in match_data['match_data']:
-        return jsonify({
+        return {
             "status": "success",
             "home_team": match_data['team_A'],
             "away_team": match_data['team_B'],
             "stats": match_data['match_data']['stats'],
             "goals": match_data['match_data']['goals'] if 'goals' in match_data['match_data'] else []
-        })
+        }
     
     # Otherwise, indicate stats not available
-    return jsonify({
+    return {
         "status": "pending",
         "message": "Match statistics not available yet",
         "home_team": match_data['team_A'],
         "away_team": match_data['team_B']
+    }
+
+
+def match_etag(match_code, view):
+    """Entity tag for one view of a match record, changes whenever the record is updated"""
+    return f"match-{match_code}-v{matches.get(match_code).get('version', 1)}-{view}"
+
+
+def publish_match_update(match_code):
+    """Push the current result and stats of a match to its subscribers"""
+    match_data = matches.get(match_code)
+    return match_events.publish(match_code, "result", {
+        "result": build_match_result(match_data),
+        "stats": build_match_stats(match_data)
     })
 
 
+def match_data_error(match_data):
+    """Why a reported match result cannot be stored, or None if it is well formed"""
+    if not isinstance(match_data, dict):
+        return "match_data must be an object"
+    for field in ('home_score', 'away_score'):
+        score = match_data.get(field)
+        if score is not None and (isinstance(score, bool) or not isinstance(score, int) or score < 0):
+            return f"{field} must be a non-negative integer"
+    if (match_data.get('home_score') is None) != (match_data.get('away_score') is None):
+        return "home_score and away_score must be given together"
+    if match_data.get('date') is not None and not isinstance(match_data['date'], str):
+        return "date must be a string"
+    return None
+
+
+def store_match_result(match_code, match_data):
+    """
+    Record a match result, from the admin endpoint or the resolver, and push it out
+
+    :raises MatchLookupError: If the match data is malformed or the match already has a result
+    """
+    # Checked before the match is marked final, so a bad report can be corrected and resent
+    error = match_data_error(match_data)
+    if error:
+        raise MatchLookupError(error, 400)
+    record = matches.record_result(match_code, match_data)
+    publish_match_update(match_code)
+
+    # Scores are reported from player 1's side
+    if match_data.get('home_score') is not None:
+        home_score, away_score = match_data['home_score'], match_data['away_score']
+        leaderboard.record_match(
+            match_code,
+            (record['player_1'], record['team_A']),
+            (record['player_2'], record['team_B']),
+            home_score,
+            away_score
+        )
+        # Pairs up with the cards of this match on either team's page, so it is counted once
+        played_at = parse_played_at(match_data.get('date'), time.time())
+        for index in (rating_engine, head_to_head):
+            index.record(record['team_A'], record['team_B'], home_score, away_score, played_at, PLATFORM_SIDE)
+
+
+# Fills in open matches by cross-checking both players' tracker pages
+match_resolver = MatchResolver(
+    matches,
+    team_cache,
+    lambda team_ids: scrape_pool.submit_many(team_ids, priority=MATCH_RESOLUTION),
+    store_match_result,
+    interval=int(os.environ.get('MATCH_RESOLVER_INTERVAL', 60))
+)
+match_resolver.start()
+
+
+def open_match_players():
+    """Tracker IDs of every player with a match waiting on a result"""
+    return {player for player in matches.open_players() if is_tracker_id(player)}
+
+
+# Keeps requested and in-play teams warm so users rarely wait on a cold scrape
+refresh_scheduler = RefreshScheduler(
+    team_cache,
+    lambda team_ids: scrape_pool.submit_many(team_ids, priority=BACKGROUND),
+    open_match_players,
+    cache_ttl=TEAM_CACHE_TTL,
+    budget_per_minute=int(os.environ.get('REFRESH_BUDGET_PER_MINUTE', 10))
+)
+refresh_scheduler.start()
+
+
+@app.route('/team-stats', methods=['GET'])
+def get_team_stats():
+    """Win rate, goals, streaks, form and rolling averages over a team's recorded history"""
+    team_id = request.args.get('team_id')
+    
+    if not team_id:
+        return jsonify({"status": "error", "message": "Team ID is required"}), 400
+    
+    # Validate team ID format
+    if not re.match(r'^[a-z0-9]{8}$', team_id.lower()):
+        return jsonify({"status": "error", "message": "Invalid team ID format"}), 400
+    
+    try:
+        window = max(1, min(int(request.args.get('window', 10)), 100))
+    except ValueError:
+        return jsonify({"status": "error", "message": "window must be a whole number"}), 400
+    
+    stats = match_history.team_stats(team_id, window=window)
+    if stats is None:
+        # Nothing recorded yet; a scrape adds the team's recent matches
+        get_team_data_async(team_id)
+        return jsonify({"status": "pending", "message": "No match history recorded yet"})
+    
+    return conditional_json({"status": "success", "team_id": team_id, "stats": stats})
+
+
+def team_name_for(team_id):
+    """Name a tracker ID plays under, from its latest scrape or its recorded history"""
+    snapshot = team_cache.get(team_id)
+    if snapshot is not None and snapshot.data.get("team_name"):
+        return snapshot.data["team_name"]
+    return match_history.team_name(team_id)
+
+
+@app.route('/team-rating', methods=['GET'])
+def get_team_rating():
+    """Elo rating of a team, optionally with its win probability against an opponent"""
+    team_id = request.args.get('team_id')
+    
+    if not team_id:
+        return jsonify({"status": "error", "message": "Team ID is required"}), 400
+    
+    # Validate team ID format
+    if not re.match(r'^[a-z0-9]{8}$', team_id.lower()):
+        return jsonify({"status": "error", "message": "Invalid team ID format"}), 400
+    
+    team_name = team_name_for(team_id)
+    rating = rating_engine.rating(team_name) if team_name else None
+    if rating is None:
+        return jsonify({"status": "error", "message": "Team has no rated matches yet"}), 404
+    
+    response = {"status": "success", "team_id": team_id, **rating}
+    
+    opponent_id = request.args.get('opponent_id')
+    if opponent_id:
+        if not is_tracker_id(opponent_id):
+            return jsonify({"status": "error", "message": "Invalid opponent_id format"}), 400
+        opponent_name = team_name_for(opponent_id)
+        if opponent_name is None:
+            return jsonify({"status": "error", "message": "Opponent has not been scraped yet"}), 404
+        response["opponent"] = rating_engine.rating(opponent_name) or {"team_name": opponent_name, "rating": rating_engine.initial, "games": 0}
+        response["win_probability"] = rating_engine.win_probability(team_name, opponent_name)
+    
+    return jsonify(response)
+
+
+@app.route('/head-to-head', methods=['GET'])
+def get_head_to_head():
+    """A team's record against one opponent: W/D/L, goals and the latest meetings"""
+    team_id = request.args.get('team_id')
+    
+    if not team_id:
+        return jsonify({"status": "error", "message": "Team ID is required"}), 400
+    
+    # Validate team ID format
+    if not re.match(r'^[a-z0-9]{8}$', team_id.lower()):
+        return jsonify({"status": "error", "message": "Invalid team ID format"}), 400
+    
+    team_name = team_name_for(team_id)
+    if team_name is None:
+        get_team_data_async(team_id)
+        return jsonify({"status": "pending", "message": "Team has not been scraped yet"})
+    
+    # The opponent may be another tracker ID or just the name shown on match cards
+    opponent_name = request.args.get('opponent')
+    opponent_id = request.args.get('opponent_id')
+    if opponent_id:
+        if not is_tracker_id(opponent_id):
+            return jsonify({"status": "error", "message": "Invalid opponent_id format"}), 400
+        opponent_name = team_name_for(opponent_id)
+        if opponent_name is None:
+            get_team_data_async(opponent_id)
+            return jsonify({"status": "pending", "message": "Opponent has not been scraped yet"})
+    if not opponent_name:
+        return jsonify({"status": "error", "message": "opponent_id or opponent is required"}), 400
+    
+    try:
+        limit = max(0, min(int(request.args.get('limit', 5)), RECENT_MATCHES))
+    except ValueError:
+        return jsonify({"status": "error", "message": "limit must be a whole number"}), 400
+    
+    record = head_to_head.lookup(team_name, opponent_name, limit)
+    if record is None:
+        record = {"team": team_name, "opponent": opponent_name, "played": 0, "recent": []}
+    
+    return jsonify({"status": "success", **record})
+
+
+# Largest leaderboard page a client may ask for
+MAX_LEADERBOARD_PAGE = 100
+
+@app.route('/leaderboard', methods=['GET'])
+def get_leaderboard():
+    """One page of the team leaderboard, best first"""
+    try:
+        offset = max(0, int(request.args.get('offset', 0)))
+        limit = max(1, min(int(request.args.get('limit', 20)), MAX_LEADERBOARD_PAGE))
+    except ValueError:
+        return jsonify({"status": "error", "message": "offset and limit must be whole numbers"}), 400
+    
+    entries = leaderboard.page(offset, limit)
+    total = len(leaderboard)
+    return conditional_json({
+        "status": "success",
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "next_offset": offset + limit if offset + limit < total else None,
+        "entries": entries
+    }, etag=f"leaderboard-v{leaderboard.version}-{offset}-{limit}")
+
+
+@app.route('/leaderboard/rank', methods=['GET'])
+def get_leaderboard_rank():
+    """Rank of one team; defaults to the logged-in user's team"""
+    team_id = request.args.get('team_id')
+    
+    if not team_id:
+        verify_jwt_in_request(optional=True, locations=["cookies"])
+        user_id = get_jwt_identity()
+        if not user_id:
+            return jsonify({"status": "error", "message": "Team ID is required"}), 400
+        profile = profile_cache.get(user_id)
+        team_id = profile.get("team_id") if profile else None
+        if not team_id:
+            return jsonify({"status": "error", "message": "No team linked to this account"}), 404
+    
+    entry = leaderboard.rank(team_id)
+    if entry is None:
+        return jsonify({"status": "error", "message": "Team is not on the leaderboard yet"}), 404
+    
+    return jsonify({"status": "success", "total": len(leaderboard), "entry": entry})
+
+
+@app.route('/match-result', methods=['GET'])
+def get_match_result():
+    """Get match result using match code"""
+    try:
+        match_code, match_data = matches.lookup(request.args.get('match_code'))
+    except MatchLookupError as e:
+        return jsonify({"status": "error", "message": e.message}), e.status_code
+    
+    return conditional_json(build_match_result(match_data), etag=match_etag(match_code, 'result'))
+
+
+@app.route('/match-stats', methods=['GET'])
+def get_match_stats():
+    """Get detailed match statistics using match code"""
+    try:
+        match_code, match_data = matches.lookup(request.args.get('match_code'))
+    except MatchLookupError as e:
+        return jsonify({"status": "error", "message": e.message}), e.status_code
+    
+    return conditional_json(build_match_stats(match_data), etag=match_etag(match_code, 'stats'))
+
+
+@app.route('/match-events', methods=['GET'])
+def stream_match_events():
+    """Push the match result and stats over Server-Sent Events once they are available"""
+    try:
+        match_code, match_data = matches.lookup(request.args.get('match_code'))
+    except MatchLookupError as e:
+        return jsonify({"status": "error", "message": e.message}), e.status_code
+
+    subscriber = match_events.subscribe(match_code)
+
+    def generate():
+        try:
+            # Tell the browser how long to wait before reconnecting after the stream ends
+            yield f"retry: {MATCH_STREAM_RETRY_MS}\n\n"
+
+            if match_data['result_fetched']:
+                yield format_sse("result", {
+                    "result": build_match_result(match_data),
+                    "stats": build_match_stats(match_data)
+                })
+                return
+
+            deadline = time.monotonic() + MATCH_STREAM_TIMEOUT
+            while time.monotonic() < deadline:
+                try:
+                    event, data = subscriber.get(timeout=SSE_KEEPALIVE_INTERVAL)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+
+                yield format_sse(event, data)
+                if event == "result":
+                    return
+        finally:
+            match_events.unsubscribe(match_code, subscriber)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.route('/update-match-result', methods=['POST'])
 def update_match_result():
     """Update match result (admin endpoint)"""
@@ -638,21 +1269,14 @@ def update_match_result():
                 return jsonify({"status": "error", "message": f"Missing required field: {field}"}), 400
         
         match_code = data['match_code']
-        token = data['token']
-        
-        # Check if match exists
-        if match_code not in matches:
-            return jsonify({"status": "error", "message": "Match not found"}), 404
         
-        # Verify token
-        match_data = matches[match_code]
-        if match_data['secure_token'] != token:
-            return jsonify({"status": "error", "message": "Invalid token"}), 403
-        
-        # Update match data
-        matches[match_code]['match_data'] = data['match_data']
-        matches[match_code]['result_fetched'] = True
-        matches[match_code]['updated_at'] = datetime.now().isoformat()
+        # Check the match exists and the token matches, then record the result unless one is already in
+        try:
+            matches.authenticate(match_code, data['token'])
+            # Update match data and notify players subscribed to this match
+            store_match_result(match_code, data['match_data'])
+        except MatchLookupError as e:
+            return jsonify({"status": "error", "message": e.message}), e.status_code
         
         return jsonify({
             "status": "success",
@@ -670,9 +1294,31 @@ def status():
         "status": "online",
         "timestamp": datetime.now().isoformat(),
         "active_matches": len(matches),
-        "cached_teams": len(team_data_cache)
+        "matches": matches.stats(),
+        "cached_teams": len(team_cache),
+        "event_subscribers": {
+            "teams": team_events.subscriber_count(),
+            "matches": match_events.subscriber_count()
+        },
+        "scrape_pool": dict(scrape_pool.stats(), queue_wait=SCRAPE_QUEUE_WAIT.summary()),
+        "tracker": {
+            "circuit": tracker_circuit.stats(),
+            "rate_limit_tokens": tracker_rate_limiter.available()
+        },
+        "refresh_scheduler": refresh_scheduler.stats(),
+        "supabase_latency": SUPABASE_LATENCY.summary(),
+        "profile_cache": profile_cache.stats(),
+        "match_history": match_history.stats(),
+        "leaderboard_teams": len(leaderboard),
+        "ratings": rating_engine.stats(),
+        "head_to_head": head_to_head.stats()
     })
 
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus exposition of scrape, cache, Supabase and request metrics"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/debug', methods=['GET'])
 def debug_info():
     """Endpoint for debugging authentication"""
@@ -775,6 +1421,7 @@ def test_page():
                 <select id="endpointSelect">
                     <option value="match-result">Match Result</option>
                     <option value="match-stats">Match Stats</option>
+                    <option value="match-events">Wait for Result (live)</option>
                 </select>
                 <button onclick="getMatchData()">Get Data</button>
             </div>
@@ -796,19 +1443,24 @@ def test_page():
                 const resultsElement = document.getElementById('results');
                 resultsElement.textContent = 'Loading...';
                 
-                try {
-                    const response = await fetch(`/team-info?team_id=${teamId}`);
-                    const data = await response.json();
-                    
-                    if (data.status === 'pending') {
-                        resultsElement.textContent = 'Data is being fetched. This may take up to 20 seconds. Refreshing in 5 seconds...';
-                        setTimeout(() => getTeamInfo(), 5000);
-                    } else {
-                        resultsElement.textContent = JSON.stringify(data, null, 2);
-                    }
-                } catch (error) {
-                    resultsElement.textContent = `Error: ${error.message}`;
-                }
+                // Stream progress and the final result instead of polling
+                const source = new EventSource(`/team-info/stream?team_id=${encodeURIComponent(teamId)}`);
+                source.addEventListener('progress', (event) => {
+                    const data = JSON.parse(event.data);
+                    resultsElement.textContent = `Data is being fetched (${data.phase || 'queued'}). This may take up to 20 seconds...`;
+                });
+                source.addEventListener('complete', (event) => {
+                    source.close();
+                    resultsElement.textContent = JSON.stringify(JSON.parse(event.data), null, 2);
+                });
+                source.addEventListener('timeout', () => {
+                    source.close();
+                    resultsElement.textContent = 'Data is still being fetched. Try again shortly.';
+                });
+                source.onerror = () => {
+                    source.close();
+                    resultsElement.textContent = 'Error: lost connection to the server';
+                };
             }
             
             async function createMatch() {
@@ -861,6 +1513,16 @@ def test_page():
                 
                 const resultsElement = document.getElementById('results');
                 resultsElement.textContent = 'Loading...';
+
+                if (endpoint === 'match-events') {
+                    resultsElement.textContent = 'Waiting for the match result...';
+                    const source = new EventSource(`/match-events?match_code=${encodeURIComponent(matchCode)}`);
+                    source.addEventListener('result', (event) => {
+                        source.close();
+                        resultsElement.textContent = JSON.stringify(JSON.parse(event.data), null, 2);
+                    });
+                    return;
+                }
                 
                 try {
                     const response = await fetch(`/${endpoint}?match_code=${encodeURIComponent(matchCode)}`);
@@ -877,80 +1539,5 @@ def test_page():
     return html
 
 if __name__ == '__main__':
-    # Create templates directory if it doesn't exist
-    import os
-    if not os.path.exists('templates'):
-        os.makedirs('templates')
-    
-    # Create index.html in templates directory
-    with open('templates/index.html', 'w') as f:
-        f.write("""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>DLL Tracker API</title>
-            <style>
-                body { font-family: Arial, sans-serif; margin: 20px; line-height: 1.6; }
-                .container { max-width: 800px; margin: 0 auto; }
-                .panel { border: 1px solid #ddd; padding: 15px; margin-bottom: 20px; border-radius: 5px; }
-                h1, h2 { color: #333; }
-                .endpoint { background: #f5f5f5; padding: 10px; margin: 10px 0; border-radius: 5px; }
-                .method { display: inline-block; padding: 3px 8px; border-radius: 3px; font-weight: bold; margin-right: 10px; }
-                .get { background: #61affe; color: white; }
-                .post { background: #49cc90; color: white; }
-                a.button { display: inline-block; padding: 8px 15px; background: #4CAF50; color: white; text-decoration: none; border-radius: 4px; }
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <h1>DLL Tracker API</h1>
-                <p>Welcome to the DLL Tracker API. Use the endpoints below to access team and match data.</p>
-                
-                <div class="panel">
-                    <h2>Available Endpoints</h2>
-                    
-                    <div class="endpoint">
-                        <span class="method get">GET</span>
-                        <strong>/team-info</strong>
-                        <p>Get comprehensive team statistics, match history, and form.</p>
-                        <p><em>Query parameter:</em> team_id (required)</p>
-                    </div>
-                    
-                    <div class="endpoint">
-                        <span class="method post">POST</span>
-                        <strong>/create-match</strong>
-                        <p>Create a new match with team and player information.</p>
-                    </div>
-                    
-                    <div class="endpoint">
-                        <span class="method get">GET</span>
-                        <strong>/match-result</strong>
-                        <p>Get match results using the match code.</p>
-                        <p><em>Query parameter:</em> match_code (required)</p>
-                    </div>
-                    
-                    <div class="endpoint">
-                        <span class="method get">GET</span>
-                        <strong>/match-stats</strong>
-                        <p>Get detailed match statistics using the match code.</p>
-                        <p><em>Query parameter:</em> match_code (required)</p>
-                    </div>
-                    
-                    <div class="endpoint">
-                        <span class="method get">GET</span>
-                        <strong>/status</strong>
-                        <p>Check the API status.</p>
-                    </div>
-                </div>
-                
-                <div class="panel">
-                    <h2>Need to test the API?</h2>
-                    <p>Use our interactive test page to try out the API endpoints.</p>
-                    <a href="/test" class="button">Go to Test Page</a>
-                </div>
-            </div>
-        </body>
-        </html>
-        """)
-    
+    # templates/index.html is committed alongside the app and documents every endpoint
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,98 @@
+"""
+Benchmark: incremental rating updates versus the batch re-seed path
+
+Generates a synthetic match stream between teams of hidden strength, then times applying
+it one match at a time through RatingEngine.record() and in one pass through
+RatingEngine.recompute(). Every match is fed twice, as it would be when both teams are
+scraped, to include the cost of dropping mirrored copies; the mirror's played_at is off by
+a few hours, as it is when the two pages are scraped at different times.
+
+Before timing, checks that a match scraped from both teams' pages hours apart is rated once.
+
+Usage: python bench_ratings.py [matches] [teams]
+"""
+import sys
+import time
+import random
+from match_history import MatchHistory
+from ratings import RatingEngine
+
+
+def synthetic_matches(count, teams, seed=1):
+    """Mirrored match stream, oldest first, where stronger teams tend to score more"""
+    rng = random.Random(seed)
+    strength = [rng.gauss(0, 1) for _ in range(teams)]
+    names = [f"Team {index}" for index in range(teams)]
+    # Keep the whole stream inside the retention period
+    start = time.time() - count
+    matches = []
+    for index in range(count):
+        a, b = rng.sample(range(teams), 2)
+        goals_a = max(0, int(rng.gauss(1.5 + 0.5 * (strength[a] - strength[b]), 1.2)))
+        goals_b = max(0, int(rng.gauss(1.5 + 0.5 * (strength[b] - strength[a]), 1.2)))
+        played_at = start + index
+        matches.append((names[a], names[b], goals_a, goals_b, played_at))
+        matches.append((names[b], names[a], goals_b, goals_a, played_at + rng.uniform(-6, 6) * 3600))
+    matches.sort(key=lambda match: match[-1])
+    return matches, dict(zip(names, strength))
+
+
+def scrape(team_name, opponent, goals_for, goals_against, date):
+    """Scrape result of a page showing a single match card"""
+    result = 'Win' if goals_for > goals_against else 'Draw' if goals_for == goals_against else 'Loss'
+    return {
+        'status': 'success',
+        'team_name': team_name,
+        'team_stats': {'games_played': 10},
+        'matches': [{'index': 0, 'away_team': opponent, 'home_score': goals_for, 'away_score': goals_against,
+                     'result': result, 'date': date}]
+    }
+
+
+def check_mirrored_scrapes():
+    """Both pages of one match, scraped six hours apart, must give a single rating update"""
+    for first_date, second_date in (('1 day ago', '1 day ago'), ('23 hours ago', '1 day ago')):
+        history = MatchHistory()
+        engine = RatingEngine()
+        scraped_at = time.time() - 86400
+        applied = engine.ingest(history.ingest('aaaa1111', scrape('Alpha', 'Beta', 3, 1, first_date), scraped_at))
+        applied += engine.ingest(history.ingest('bbbb2222', scrape('Beta', 'Alpha', 1, 3, second_date),
+                                                scraped_at + 6 * 3600))
+        assert applied == 1, f"mirrored match scraped hours apart ({first_date!r}, {second_date!r}) rated {applied} times"
+        assert engine.recompute(history.export()) == 1, "re-seed counted the mirrored match twice"
+    print("Mirrored scrapes hours apart are rated once")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    teams = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    check_mirrored_scrapes()
+    matches, strength = synthetic_matches(count, teams)
+
+    incremental = RatingEngine()
+    start = time.perf_counter()
+    for match in matches:
+        incremental.record(*match)
+    incremental_seconds = time.perf_counter() - start
+
+    batch = RatingEngine()
+    start = time.perf_counter()
+    applied = batch.recompute(matches)
+    batch_seconds = time.perf_counter() - start
+
+    drift = max(
+        abs(incremental.rating(name)['rating'] - batch.rating(name)['rating'])
+        for name in strength if batch.rating(name)
+    )
+    strongest = sorted(strength, key=strength.get, reverse=True)[:10]
+    mean_top_rating = sum(batch.rating(name)['rating'] for name in strongest if batch.rating(name)) / len(strongest)
+
+    print(f"{count} matches ({len(matches)} rows with mirrors) between {teams} teams, {applied} applied")
+    print(f"{'incremental record()':<24} {incremental_seconds:8.2f} s  {len(matches) / incremental_seconds:12,.0f} rows/s")
+    print(f"{'batch recompute()':<24} {batch_seconds:8.2f} s  {len(matches) / batch_seconds:12,.0f} rows/s")
+    print(f"Largest difference between the two paths: {drift:.3f} rating points")
+    print(f"Mean rating of the 10 strongest teams: {mean_top_rating:.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Microbenchmark: per-hit cost of serving a cached team snapshot
+
+Compares building the response with jsonify() on every hit, as /team-info used to,
+with snapshot_response(), which serves the bytes a TeamSnapshot encodes once when it
+is stored. Both run inside a request context, with and without gzip accepted, so the
+numbers include Flask's response construction.
+
+Usage: python bench_team_cache.py [iterations]
+"""
+import sys
+import gzip
+import time
+from flask import Flask, jsonify
+from http_cache import snapshot_response
+from team_cache import TeamSnapshot
+
+
+def sample_team_data():
+    """Payload shaped like TrackerScraper.to_json() output"""
+    matches = [
+        {
+            'index': i,
+            'home_team': 'Lightning FC',
+            'away_team': f"Opponent {i}",
+            'home_score': i % 4,
+            'away_score': (i + 1) % 3,
+            'result': ['Win', 'Draw', 'Loss'][i % 3],
+            'date': f"{i + 1} days ago"
+        }
+        for i in range(10)
+    ]
+    stats = {
+        name: {'home': 50 + i, 'away': 50 - i}
+        for i, name in enumerate(['possession', 'shots', 'shots_on_target', 'corners', 'fouls',
+                                  'offsides', 'passes', 'pass_accuracy', 'tackles', 'saves'])
+    }
+    return {
+        'status': 'success',
+        'team_name': 'Lightning FC',
+        'team_stats': {'games_played': 412, 'games_won': 250, 'games_lost': 100, 'win_percentage': 60.7},
+        'matches': matches,
+        'form': ['Win', 'Draw', 'Loss', 'Win', 'Win'],
+        'recent_match': matches[0],
+        'recent_match_stats': {'home_team': 'Lightning FC', 'away_team': 'Opponent 0', 'stats': stats},
+        'recent_match_goals': [
+            {'time': f"{m}'", 'scorer': f"Player {m}", 'team': 'Lightning FC', 'assist': 'No assist'}
+            for m in (12, 37, 81)
+        ]
+    }
+
+
+def per_hit_microseconds(func, iterations):
+    start = time.process_time()
+    for _ in range(iterations):
+        func()
+    return (time.process_time() - start) / iterations * 1e6
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    data = sample_team_data()
+    snapshot = TeamSnapshot('4c51fw0c', data)
+    snapshot.encoded('gzip')
+    # A bare app is enough for a request context and avoids starting the API's pools and clients
+    app = Flask(__name__)
+
+    results = {}
+    with app.test_request_context('/team-info'):
+        results['jsonify per hit'] = per_hit_microseconds(lambda: jsonify(data), iterations)
+        results['snapshot_response per hit'] = per_hit_microseconds(lambda: snapshot_response(snapshot), iterations)
+    with app.test_request_context('/team-info', headers={'Accept-Encoding': 'gzip'}):
+        results['jsonify + gzip per hit'] = per_hit_microseconds(
+            lambda: gzip.compress(jsonify(data).get_data()), iterations // 10)
+        results['snapshot_response (gzip)'] = per_hit_microseconds(lambda: snapshot_response(snapshot), iterations)
+
+    print(f"Payload: {len(snapshot.body)} bytes, {len(snapshot.encoded('gzip'))} bytes gzipped")
+    for name, micros in results.items():
+        print(f"{name:<28} {micros:10.2f} us CPU")
+
+
+if __name__ == '__main__':
+    main()
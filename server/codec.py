@@ -0,0 +1,28 @@
+import gzip
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the stdlib encoder is the fallback
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+
+def encode_json(payload):
+    """Serialize a payload to compact UTF-8 JSON, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+
+def compress(body, encoding):
+    """Compress a response body with the given content encoding"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=6)
+    return body
@@ -0,0 +1,62 @@
+import json
+import queue
+import threading
+
+
+class EventBroker:
+    def __init__(self, max_queue_size=100):
+        """
+        In-process publish/subscribe hub used to push updates to waiting clients
+
+        :param max_queue_size: Events buffered per subscriber before new ones are dropped
+        """
+        self.max_queue_size = max_queue_size
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, key):
+        """Register interest in a key and return the queue events will arrive on"""
+        subscriber = queue.Queue(maxsize=self.max_queue_size)
+        with self._lock:
+            self._subscribers.setdefault(key, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, key, subscriber):
+        """Stop delivering events for a key to the given queue"""
+        with self._lock:
+            subscribers = self._subscribers.get(key)
+            if not subscribers:
+                return
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers[key]
+
+    def publish(self, key, event, data=None):
+        """Deliver an event to every subscriber of a key, returns the number reached"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(key, ()))
+
+        delivered = 0
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait((event, data))
+                delivered += 1
+            except queue.Full:
+                # A slow client should never block the publisher
+                continue
+        return delivered
+
+    def subscriber_count(self, key=None):
+        """Number of subscribers for a key, or across all keys"""
+        with self._lock:
+            if key is not None:
+                return len(self._subscribers.get(key, ()))
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+def format_sse(event, data=None):
+    """Format a single Server-Sent Events message"""
+    message = f"event: {event}\n"
+    if data is not None:
+        message += f"data: {json.dumps(data)}\n"
+    return message + "\n"
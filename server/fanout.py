@@ -0,0 +1,36 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# Shared pool for upstream I/O; sized for blocking HTTP calls, not CPU work
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix='fanout')
+
+
+def fan_out(*calls, timeout=None):
+    """
+    Run independent upstream calls concurrently and return their results in order
+
+    Each call is a zero-argument callable (use a lambda or functools.partial to bind
+    arguments). Total latency is roughly that of the slowest call rather than the sum.
+
+    :param calls: Callables to run
+    :param timeout: Optional overall timeout in seconds
+    :return: List of results in the same order as the calls
+    :raises TimeoutError: If the calls do not all finish within the timeout
+    :raises Exception: The first exception raised by any call, in call order
+    """
+    if len(calls) == 1:
+        # Nothing to overlap, skip the thread hop
+        return [calls[0]()]
+
+    futures = [_executor.submit(call) for call in calls]
+    done, not_done = wait(futures, timeout=timeout)
+    if not_done:
+        for future in not_done:
+            future.cancel()
+        raise TimeoutError(f"{len(not_done)} of {len(futures)} upstream calls timed out")
+
+    return [future.result() for future in futures]
+
+
+def run_in_background(call):
+    """Start a fire-and-forget upstream call on the shared pool and return its future"""
+    return _executor.submit(call)
@@ -0,0 +1,151 @@
+import time
+import bisect
+import threading
+from match_history import MirrorIndex
+from ratings import FINGERPRINT_RETENTION
+
+# Results kept per pair for the "last N meetings" view
+RECENT_MATCHES = 20
+
+
+class PairRecord:
+    __slots__ = ('first_wins', 'draws', 'second_wins', 'first_goals', 'second_goals', 'recent')
+
+    def __init__(self):
+        """Running record between two teams, from the point of view of the alphabetically first"""
+        self.first_wins = 0
+        self.draws = 0
+        self.second_wins = 0
+        self.first_goals = 0
+        self.second_goals = 0
+        # (played_at, first team's goals, second team's goals), oldest first
+        self.recent = []
+
+    def add(self, first_goals, second_goals, played_at):
+        if first_goals > second_goals:
+            self.first_wins += 1
+        elif first_goals == second_goals:
+            self.draws += 1
+        else:
+            self.second_wins += 1
+        self.first_goals += first_goals
+        self.second_goals += second_goals
+        bisect.insort(self.recent, (played_at, first_goals, second_goals))
+        if len(self.recent) > RECENT_MATCHES:
+            del self.recent[0]
+
+
+class HeadToHeadIndex:
+    def __init__(self):
+        """Win/draw/loss, goals and recent results for every pair of teams that have met, by team name"""
+        self._pairs = {}
+        self._seen = MirrorIndex()
+        self._last_prune = time.time()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _pair(team, opponent):
+        """Unordered pair key and whether team is the first of the two"""
+        if team <= opponent:
+            return (team, opponent), True
+        return (opponent, team), False
+
+    def record(self, team, opponent, goals_for, goals_against, played_at=None, side=None):
+        """
+        Add one match to the pair's record
+
+        :param side: Where the match was seen, see MirrorIndex.add
+        :return: False if the match was already recorded from another side
+        """
+        played_at = played_at or time.time()
+        key, team_first = self._pair(team, opponent)
+        first_goals, second_goals = (goals_for, goals_against) if team_first else (goals_against, goals_for)
+        with self._lock:
+            if not self._seen.add(team, opponent, goals_for, goals_against, played_at, side):
+                return False
+            record = self._pairs.get(key)
+            if record is None:
+                record = self._pairs[key] = PairRecord()
+            record.add(first_goals, second_goals, played_at)
+            self._prune()
+            return True
+
+    def ingest(self, rows):
+        """Add new MatchHistory rows, skipping matches already seen from the other side"""
+        added = 0
+        for row in rows:
+            added += self.record(row['team_name'], row['opponent'], row['goals_for'],
+                                 row['goals_against'], row['played_at'])
+        return added
+
+    def rebuild(self, matches):
+        """
+        Replace the index with one built from a full match stream
+
+        :param matches: (team, opponent, goals_for, goals_against, played_at) tuples as seen from team's page
+        """
+        with self._lock:
+            self._pairs = {}
+            self._seen = MirrorIndex()
+        for match in matches:
+            self.record(*match)
+
+    def lookup(self, team, opponent, limit=5):
+        """
+        A team's record against an opponent, None if they have never met
+
+        :param limit: Most recent meetings to include, newest first
+        """
+        key, team_first = self._pair(team, opponent)
+        with self._lock:
+            record = self._pairs.get(key)
+            if record is None:
+                return None
+            if team_first:
+                wins, losses, goals_for, goals_against = record.first_wins, record.second_wins, record.first_goals, record.second_goals
+            else:
+                wins, losses, goals_for, goals_against = record.second_wins, record.first_wins, record.second_goals, record.first_goals
+            recent = record.recent[::-1][:limit]
+            draws = record.draws
+
+        played = wins + draws + losses
+        return {
+            "team": team,
+            "opponent": opponent,
+            "played": played,
+            "wins": wins,
+            "draws": draws,
+            "losses": losses,
+            "goals_for": goals_for,
+            "goals_against": goals_against,
+            "win_percentage": round(wins / played * 100, 1),
+            "recent": [
+                {
+                    "played_at": played_at,
+                    "goals_for": first if team_first else second,
+                    "goals_against": second if team_first else first,
+                    "result": self._result(first, second, team_first)
+                }
+                for played_at, first, second in recent
+            ]
+        }
+
+    @staticmethod
+    def _result(first_goals, second_goals, team_first):
+        if first_goals == second_goals:
+            return "Draw"
+        return "Win" if (first_goals > second_goals) == team_first else "Loss"
+
+    def _prune(self):
+        # Called with the lock held; sweeps old matches at most once an hour
+        now = time.time()
+        if now - self._last_prune < 3600:
+            return
+        cutoff = now - FINGERPRINT_RETENTION
+        self._seen.prune(cutoff)
+        self._last_prune = now
+
+    def stats(self):
+        """Indexed pairs, for /status"""
+        with self._lock:
+            return {"pairs": len(self._pairs), "matches": len(self._seen)}
@@ -0,0 +1,81 @@
+from flask import request, Response
+from codec import encode_json, compress, brotli
+
+# Bodies smaller than this are not worth the compression overhead
+MIN_COMPRESS_SIZE = 1024
+
+
+def negotiate_encoding(accept_encoding=None):
+    """Pick the best compression the client accepts: 'br', 'gzip' or None"""
+    if accept_encoding is None:
+        accept_encoding = request.accept_encodings
+    if brotli is not None and accept_encoding['br']:
+        return 'br'
+    if accept_encoding['gzip']:
+        return 'gzip'
+    return None
+
+
+def not_modified(etag):
+    """Whether the client already holds this version, per If-None-Match"""
+    return etag is not None and request.if_none_match.contains_weak(etag)
+
+
+def conditional_json(payload, etag=None, status=200):
+    """
+    Build a JSON response honouring If-None-Match and Accept-Encoding
+
+    :param payload: JSON-friendly data, only serialized if the client needs the body
+    :param etag: Version tag of the payload; enables 304 responses when set
+    :param status: HTTP status for a full response
+    :return: flask.Response
+    """
+    if status == 200 and not_modified(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    return json_bytes_response(encode_json(payload), etag=etag, status=status)
+
+
+def snapshot_response(snapshot):
+    """
+    Send a cached snapshot using its pre-serialized and pre-compressed bodies
+
+    :param snapshot: Object with etag, body and encoded(encoding), e.g. a TeamSnapshot
+    :return: flask.Response
+    """
+    if not_modified(snapshot.etag):
+        response = Response(status=304)
+        response.set_etag(snapshot.etag)
+        return response
+
+    headers = {'Vary': 'Accept-Encoding'}
+    encoding = negotiate_encoding() if len(snapshot.body) >= MIN_COMPRESS_SIZE else None
+    if encoding:
+        headers['Content-Encoding'] = encoding
+
+    response = Response(snapshot.encoded(encoding), mimetype='application/json', headers=headers)
+    response.set_etag(snapshot.etag)
+    return response
+
+
+def json_bytes_response(body, etag=None, status=200):
+    """
+    Send an already serialized JSON body, compressed when it is large enough
+
+    :param body: UTF-8 encoded JSON
+    :param etag: Optional version tag to attach
+    :param status: HTTP status
+    :return: flask.Response
+    """
+    headers = {'Vary': 'Accept-Encoding'}
+    encoding = negotiate_encoding() if len(body) >= MIN_COMPRESS_SIZE else None
+    if encoding:
+        body = compress(body, encoding)
+        headers['Content-Encoding'] = encoding
+
+    response = Response(body, status=status, mimetype='application/json', headers=headers)
+    if etag is not None:
+        response.set_etag(etag)
+    return response
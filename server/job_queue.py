@@ -0,0 +1,473 @@
+import json
+import time
+import sqlite3
+import logging
+import threading
+import traceback
+from abc import ABC, abstractmethod
+from scrape_pool import PRIORITIES, INTERACTIVE
+
+logger = logging.getLogger('job_queue')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    team_id TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    queued_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS jobs_active_team ON jobs(team_id) WHERE status IN ('queued', 'leased');
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, priority, queued_at);
+CREATE TABLE IF NOT EXISTS results (
+    team_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    seq INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_seq ON results(seq);
+CREATE TABLE IF NOT EXISTS rate_limits (
+    name TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS circuits (
+    name TEXT PRIMARY KEY,
+    state TEXT NOT NULL DEFAULT 'closed',
+    failures INTEGER NOT NULL DEFAULT 0,
+    opened_at REAL,
+    probe_at REAL
+);
+"""
+
+
+class Job:
+    def __init__(self, job_id, team_id, priority, queued_at, attempts, owner):
+        """A leased scrape job; only the owner named here may extend or finish it"""
+        self.id = job_id
+        self.team_id = team_id
+        self.priority = priority
+        self.queued_at = queued_at
+        self.attempts = attempts
+        self.owner = owner
+
+
+class JobBroker(ABC):
+    """
+    Interface between API nodes that queue scrapes and worker processes that run them
+
+    Jobs are leased rather than popped: a worker that dies mid-scrape stops renewing its
+    lease, and once the lease expires the job is handed to another worker.
+    """
+
+    @abstractmethod
+    def enqueue(self, team_ids, priority=INTERACTIVE):
+        """Queue scrapes, skipping teams already queued or leased; return team ID -> 'queued' or 'in_progress'"""
+
+    @abstractmethod
+    def lease(self, owner, lease_seconds):
+        """Take the most urgent ready job, or None"""
+
+    @abstractmethod
+    def extend(self, job, lease_seconds):
+        """Renew a lease; False if the job was lost to another worker"""
+
+    @abstractmethod
+    def complete(self, job, data):
+        """Store a job's result and remove the job"""
+
+    @abstractmethod
+    def release(self, job, error):
+        """Give a job back after an unexpected failure so it can be retried"""
+
+    @abstractmethod
+    def results_since(self, cursor, limit=100):
+        """Results stored after a cursor, as (cursor, team_id, data, fetched_at) tuples"""
+
+    @abstractmethod
+    def is_pending(self, team_id):
+        """Whether a scrape for the team is queued or leased"""
+
+    @abstractmethod
+    def stats(self):
+        """Queue depth, running jobs and live workers, for /status"""
+
+    @abstractmethod
+    def rate_limiter(self, name, rate, capacity):
+        """Token bucket whose state is shared by every process using this broker"""
+
+    @abstractmethod
+    def circuit_breaker(self, name, failure_threshold, reset_timeout):
+        """Circuit breaker whose state is shared by every process using this broker"""
+
+
+class SQLiteJobQueue(JobBroker):
+    def __init__(self, path, max_attempts=3, aging_interval=30):
+        """
+        Durable job queue and result store in one SQLite file shared by API nodes and workers
+
+        :param path: Database file; every process must be able to reach it
+        :param max_attempts: Leases a job may take before it is marked dead
+        :param aging_interval: Seconds of waiting that promote a job by one priority class
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+        self.aging_interval = aging_interval
+        self._local = threading.local()
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def _transaction(self):
+        return _Transaction(self._connection())
+
+    def enqueue(self, team_ids, priority=INTERACTIVE):
+        rank = PRIORITIES.index(priority)
+        statuses = {}
+        now = time.time()
+        with self._transaction() as connection:
+            for team_id in team_ids:
+                if team_id in statuses:
+                    continue
+                row = connection.execute(
+                    "SELECT id, priority, status FROM jobs WHERE team_id = ? AND status IN ('queued', 'leased')",
+                    (team_id,)
+                ).fetchone()
+                if row is None:
+                    connection.execute(
+                        "INSERT INTO jobs (team_id, priority, queued_at) VALUES (?, ?, ?)", (team_id, rank, now)
+                    )
+                    statuses[team_id] = 'queued'
+                    continue
+                if row[2] == 'queued' and rank < row[1]:
+                    # Someone is now waiting on a job queued speculatively
+                    connection.execute("UPDATE jobs SET priority = ? WHERE id = ?", (rank, row[0]))
+                statuses[team_id] = 'in_progress'
+        return statuses
+
+    def lease(self, owner, lease_seconds):
+        now = time.time()
+        with self._transaction() as connection:
+            # Expired leases belong to crashed or stuck workers; give up on jobs that keep failing
+            connection.execute(
+                "UPDATE jobs SET status = 'dead', error = 'lease expired' "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, self.max_attempts)
+            )
+            row = connection.execute(
+                "SELECT id, team_id, priority, queued_at, attempts FROM jobs "
+                "WHERE status = 'queued' OR (status = 'leased' AND lease_expires < ?) "
+                "ORDER BY priority - (? - queued_at) / ?, id LIMIT 1",
+                (now, now, self.aging_interval)
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                "UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1 "
+                "WHERE id = ?",
+                (owner, now + lease_seconds, row[0])
+            )
+        return Job(row[0], row[1], PRIORITIES[row[2]], row[3], row[4] + 1, owner)
+
+    def extend(self, job, lease_seconds):
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (time.time() + lease_seconds, job.id, job.owner)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job, data):
+        with self._transaction() as connection:
+            seq = connection.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM results").fetchone()[0]
+            connection.execute(
+                "INSERT INTO results (team_id, data, fetched_at, seq) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(team_id) DO UPDATE SET data = excluded.data, fetched_at = excluded.fetched_at, "
+                "seq = excluded.seq",
+                (job.team_id, json.dumps(data), time.time(), seq)
+            )
+            connection.execute("DELETE FROM jobs WHERE id = ? AND lease_owner = ?", (job.id, job.owner))
+
+    def release(self, job, error):
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'dead' ELSE 'queued' END, "
+                "lease_owner = NULL, lease_expires = NULL, error = ? "
+                "WHERE id = ? AND lease_owner = ?",
+                (self.max_attempts, error, job.id, job.owner)
+            )
+
+    def results_since(self, cursor, limit=100):
+        rows = self._connection().execute(
+            "SELECT seq, team_id, data, fetched_at FROM results WHERE seq > ? ORDER BY seq LIMIT ?",
+            (cursor, limit)
+        ).fetchall()
+        return [(seq, team_id, json.loads(data), fetched_at) for seq, team_id, data, fetched_at in rows]
+
+    def is_pending(self, team_id):
+        row = self._connection().execute(
+            "SELECT 1 FROM jobs WHERE team_id = ? AND status IN ('queued', 'leased')", (team_id,)
+        ).fetchone()
+        return row is not None
+
+    def stats(self):
+        now = time.time()
+        counts = self._connection().execute(
+            "SELECT status, priority, COUNT(*) FROM jobs GROUP BY status, priority"
+        ).fetchall()
+        workers = self._connection().execute(
+            "SELECT COUNT(DISTINCT lease_owner) FROM jobs WHERE status = 'leased' AND lease_expires >= ?", (now,)
+        ).fetchone()[0]
+        queued = {priority: 0 for priority in PRIORITIES}
+        running = {priority: 0 for priority in PRIORITIES}
+        dead = 0
+        for status, rank, count in counts:
+            if status == 'queued':
+                queued[PRIORITIES[rank]] += count
+            elif status == 'leased':
+                running[PRIORITIES[rank]] += count
+            elif status == 'dead':
+                dead += count
+        return {
+            "workers": workers,
+            "queued": sum(queued.values()),
+            "running": sum(running.values()),
+            "dead": dead,
+            "queued_by_priority": queued,
+            "running_by_priority": running
+        }
+
+    def rate_limiter(self, name, rate, capacity):
+        return SharedTokenBucket(self, name, rate, capacity)
+
+    def circuit_breaker(self, name, failure_threshold, reset_timeout):
+        return SharedCircuitBreaker(self, name, failure_threshold, reset_timeout)
+
+
+class _Transaction:
+    def __init__(self, connection):
+        """Write transaction taken up front, so concurrent workers serialise instead of deadlocking"""
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute('BEGIN IMMEDIATE')
+        return self.connection
+
+    def __exit__(self, exc_type, exc, tb):
+        self.connection.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
+
+
+class SharedTokenBucket:
+    def __init__(self, queue, name, rate, capacity):
+        """
+        throttle.TokenBucket kept in the job queue's database
+
+        Every worker process and API node draws from the same bucket, so the limit holds for
+        the whole deployment rather than once per process. Wall-clock time is used because
+        the processes share no monotonic clock.
+        """
+        self.queue = queue
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        with queue._transaction() as connection:
+            connection.execute(
+                "INSERT OR IGNORE INTO rate_limits (name, tokens, updated) VALUES (?, ?, ?)",
+                (name, float(capacity), time.time())
+            )
+
+    def _take(self, take):
+        """Refill, then take a token if asked and one is there; returns (taken, tokens left)"""
+        now = time.time()
+        with self.queue._transaction() as connection:
+            tokens, updated = connection.execute(
+                "SELECT tokens, updated FROM rate_limits WHERE name = ?", (self.name,)
+            ).fetchone()
+            tokens = min(self.capacity, tokens + max(0, now - updated) * self.rate)
+            taken = take and tokens >= 1
+            if taken:
+                tokens -= 1
+            connection.execute("UPDATE rate_limits SET tokens = ?, updated = ? WHERE name = ?", (tokens, now, self.name))
+        return taken, tokens
+
+    def try_acquire(self):
+        return self._take(True)[0]
+
+    def acquire(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            taken, tokens = self._take(True)
+            if taken:
+                return True
+            wait = (1 - tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+    def available(self):
+        return round(self._take(False)[1], 2)
+
+
+class SharedCircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, queue, name, failure_threshold, reset_timeout, probe_timeout=300):
+        """
+        throttle.CircuitBreaker kept in the job queue's database, so failures seen by any
+        worker open it for all of them and API nodes see its real state
+
+        :param probe_timeout: Seconds after which a half-open probe that never reported back,
+            because its worker died, stops blocking the next one
+        """
+        self.queue = queue
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.probe_timeout = probe_timeout
+        with queue._transaction() as connection:
+            connection.execute("INSERT OR IGNORE INTO circuits (name) VALUES (?)", (name,))
+
+    def _read(self, connection, now):
+        state, failures, opened_at, probe_at = connection.execute(
+            "SELECT state, failures, opened_at, probe_at FROM circuits WHERE name = ?", (self.name,)
+        ).fetchone()
+        if state == self.OPEN and now - opened_at >= self.reset_timeout:
+            state, probe_at = self.HALF_OPEN, None
+            connection.execute(
+                "UPDATE circuits SET state = ?, probe_at = NULL WHERE name = ?", (state, self.name)
+            )
+        return state, failures, opened_at, probe_at
+
+    @property
+    def state(self):
+        with self.queue._transaction() as connection:
+            return self._read(connection, time.time())[0]
+
+    def allow(self):
+        now = time.time()
+        with self.queue._transaction() as connection:
+            state, _, _, probe_at = self._read(connection, now)
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and (probe_at is None or now - probe_at >= self.probe_timeout):
+                connection.execute("UPDATE circuits SET probe_at = ? WHERE name = ?", (now, self.name))
+                return True
+            return False
+
+    def release(self):
+        with self.queue._transaction() as connection:
+            connection.execute("UPDATE circuits SET probe_at = NULL WHERE name = ?", (self.name,))
+
+    def record_success(self):
+        with self.queue._transaction() as connection:
+            connection.execute(
+                "UPDATE circuits SET state = ?, failures = 0, probe_at = NULL WHERE name = ?", (self.CLOSED, self.name)
+            )
+
+    def record_failure(self):
+        now = time.time()
+        with self.queue._transaction() as connection:
+            state, failures, _, _ = self._read(connection, now)
+            failures += 1
+            if state == self.HALF_OPEN or failures >= self.failure_threshold:
+                connection.execute(
+                    "UPDATE circuits SET state = ?, failures = ?, opened_at = ?, probe_at = NULL WHERE name = ?",
+                    (self.OPEN, failures, now, self.name)
+                )
+            else:
+                connection.execute("UPDATE circuits SET failures = ? WHERE name = ?", (failures, self.name))
+
+    def stats(self):
+        now = time.time()
+        with self.queue._transaction() as connection:
+            state, failures, opened_at, _ = self._read(connection, now)
+        retry_in = None
+        if state == self.OPEN:
+            retry_in = round(max(0, self.reset_timeout - (now - opened_at)), 1)
+        return {"state": state, "consecutive_failures": failures, "retry_in": retry_in}
+
+
+def open_broker(url):
+    """
+    Broker for a connection URL
+
+    Only sqlite:///path/to/file.db is built in; other brokers implement JobBroker and are
+    added here.
+    """
+    if url.startswith('sqlite:///'):
+        return SQLiteJobQueue(url[len('sqlite:///'):])
+    raise ValueError(f"Unsupported scrape broker: {url}")
+
+
+class RemoteScrapePool:
+    def __init__(self, broker, on_result, poll_interval=1.0):
+        """
+        ScrapePool stand-in for API nodes whose scrapes run in separate worker processes
+
+        Jobs go to the broker; a background thread reads finished results back and hands
+        each to on_result, so the local cache and subscribers see them as if scraped here.
+
+        :param broker: JobBroker shared with the workers
+        :param on_result: Callable (team_id, data, fetched_at) run for every new result
+        :param poll_interval: Seconds between result checks
+        """
+        self.broker = broker
+        self.on_result = on_result
+        self.poll_interval = poll_interval
+        self._cursor = 0
+        self._thread = None
+
+    def start(self):
+        """Start reading results, beginning with everything already in the shared store"""
+        if self._thread is not None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(self.poll_interval)
+                try:
+                    self.poll_results()
+                except Exception as e:
+                    logger.error(f"Reading scrape results failed: {str(e)}\n{traceback.format_exc()}")
+
+        self._thread = threading.Thread(target=loop, name='scrape-results', daemon=True)
+        self._thread.start()
+
+    def poll_results(self):
+        """Deliver every result stored since the last poll"""
+        while True:
+            results = self.broker.results_since(self._cursor)
+            for seq, team_id, data, fetched_at in results:
+                self._cursor = seq
+                self.on_result(team_id, data, fetched_at)
+            if len(results) < 100:
+                return
+
+    def submit(self, team_id, priority=INTERACTIVE):
+        return self.submit_many([team_id], priority)[team_id] == 'queued'
+
+    def submit_many(self, team_ids, priority=INTERACTIVE):
+        return self.broker.enqueue(team_ids, priority)
+
+    def is_pending(self, team_id):
+        return self.broker.is_pending(team_id)
+
+    def stats(self):
+        return self.broker.stats()
@@ -0,0 +1,210 @@
+import random
+import threading
+
+# Points awarded per platform match, as in league tables
+POINTS = {'Win': 3, 'Draw': 1, 'Loss': 0}
+
+
+class _Node:
+    __slots__ = ('key', 'next', 'width')
+
+    def __init__(self, key, level):
+        self.key = key
+        self.next = [None] * level
+        # width[i] is how many positions next[i] skips ahead
+        self.width = [1] * level
+
+
+class IndexableSkipList:
+    MAX_LEVEL = 32
+
+    def __init__(self):
+        """
+        Sorted collection of unique keys with O(log n) insert, remove, rank and positional access
+
+        Each link records how many elements it skips, so the position of a key is the sum
+        of the widths followed on the way to it.
+        """
+        self.head = _Node(None, self.MAX_LEVEL)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def _random_level(self):
+        level = 1
+        while level < self.MAX_LEVEL and random.random() < 0.5:
+            level += 1
+        return level
+
+    def insert(self, key):
+        chain = [None] * self.MAX_LEVEL
+        steps_at_level = [0] * self.MAX_LEVEL
+        node = self.head
+        for level in reversed(range(self.MAX_LEVEL)):
+            while node.next[level] is not None and node.next[level].key < key:
+                steps_at_level[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+
+        new_level = self._random_level()
+        new_node = _Node(key, new_level)
+        steps = 0
+        for level in range(new_level):
+            previous = chain[level]
+            new_node.next[level] = previous.next[level]
+            previous.next[level] = new_node
+            new_node.width[level] = previous.width[level] - steps
+            previous.width[level] = steps + 1
+            steps += steps_at_level[level]
+        for level in range(new_level, self.MAX_LEVEL):
+            chain[level].width[level] += 1
+        self.size += 1
+
+    def remove(self, key):
+        """Remove a key, raising KeyError if it is not present"""
+        chain = [None] * self.MAX_LEVEL
+        node = self.head
+        for level in reversed(range(self.MAX_LEVEL)):
+            while node.next[level] is not None and node.next[level].key < key:
+                node = node.next[level]
+            chain[level] = node
+
+        target = chain[0].next[0]
+        if target is None or target.key != key:
+            raise KeyError(key)
+        for level in range(len(target.next)):
+            previous = chain[level]
+            previous.width[level] += target.width[level] - 1
+            previous.next[level] = target.next[level]
+        for level in range(len(target.next), self.MAX_LEVEL):
+            chain[level].width[level] -= 1
+        self.size -= 1
+
+    def rank(self, key):
+        """Zero-based position of a key, or None if it is not present"""
+        node = self.head
+        position = -1
+        for level in reversed(range(self.MAX_LEVEL)):
+            while node.next[level] is not None and node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+        candidate = node.next[0]
+        if candidate is None or candidate.key != key:
+            return None
+        return position + 1
+
+    def slice(self, start, count):
+        """Up to count keys starting at position start"""
+        if start < 0 or start >= self.size or count <= 0:
+            return []
+        node = self.head
+        remaining = start + 1
+        for level in reversed(range(self.MAX_LEVEL)):
+            while node.next[level] is not None and node.width[level] <= remaining:
+                remaining -= node.width[level]
+                node = node.next[level]
+        keys = []
+        while node is not None and len(keys) < count:
+            keys.append(node.key)
+            node = node.next[0]
+        return keys
+
+
+class Leaderboard:
+    def __init__(self):
+        """
+        Team ranking kept in order as results arrive, so reads never sort
+
+        Teams are ranked by points from matches played through the platform, then goal
+        difference, then the win percentage shown on their tracker page.
+        """
+        self._entries = {}
+        self._keys = {}
+        self._counted_matches = set()
+        self._index = IndexableSkipList()
+        self._lock = threading.Lock()
+        self.version = 0
+
+    def _entry(self, team_id):
+        entry = self._entries.get(team_id)
+        if entry is None:
+            entry = self._entries[team_id] = {
+                'team_id': team_id, 'team_name': None, 'points': 0, 'played': 0, 'wins': 0,
+                'draws': 0, 'losses': 0, 'goals_for': 0, 'goals_against': 0, 'goal_difference': 0,
+                'win_percentage': 0
+            }
+        return entry
+
+    @staticmethod
+    def _sort_key(entry):
+        return (-entry['points'], -entry['goal_difference'], -entry['win_percentage'], entry['team_id'])
+
+    def _reindex(self, entry):
+        # Re-insert under the new key: two O(log n) operations instead of a re-sort
+        old_key = self._keys.get(entry['team_id'])
+        new_key = self._sort_key(entry)
+        if old_key == new_key:
+            return
+        if old_key is not None:
+            self._index.remove(old_key)
+        self._index.insert(new_key)
+        self._keys[entry['team_id']] = new_key
+        self.version += 1
+
+    def update_team(self, team_id, team_name=None, win_percentage=None):
+        """Refresh a team's name and tracker win percentage from a scrape"""
+        with self._lock:
+            entry = self._entry(team_id)
+            if team_name:
+                entry['team_name'] = team_name
+            if win_percentage is not None:
+                entry['win_percentage'] = win_percentage
+            self._reindex(entry)
+
+    def record_match(self, match_code, team_1, team_2, score_1, score_2):
+        """
+        Credit a finished platform match to both teams; each match code counts once
+
+        :param team_1: (team_id, team_name) of the first player
+        :param team_2: (team_id, team_name) of the second player
+        :return: False if the match had already been counted
+        """
+        with self._lock:
+            if match_code in self._counted_matches:
+                return False
+            self._counted_matches.add(match_code)
+            for (team_id, team_name), scored, conceded in ((team_1, score_1, score_2), (team_2, score_2, score_1)):
+                entry = self._entry(team_id)
+                if team_name and not entry['team_name']:
+                    entry['team_name'] = team_name
+                result = 'Win' if scored > conceded else 'Draw' if scored == conceded else 'Loss'
+                entry['points'] += POINTS[result]
+                entry['played'] += 1
+                entry[{'Win': 'wins', 'Draw': 'draws', 'Loss': 'losses'}[result]] += 1
+                entry['goals_for'] += scored
+                entry['goals_against'] += conceded
+                entry['goal_difference'] = entry['goals_for'] - entry['goals_against']
+                self._reindex(entry)
+            return True
+
+    def page(self, offset=0, limit=20):
+        """Entries ranked offset+1 to offset+limit, each with its rank"""
+        with self._lock:
+            keys = self._index.slice(offset, limit)
+            return [dict(self._entries[key[-1]], rank=offset + position + 1) for position, key in enumerate(keys)]
+
+    def top(self, k=10):
+        return self.page(0, k)
+
+    def rank(self, team_id):
+        """A team's entry with its current rank, or None if it is not ranked"""
+        with self._lock:
+            key = self._keys.get(team_id)
+            if key is None:
+                return None
+            return dict(self._entries[team_id], rank=self._index.rank(key) + 1)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._index)
@@ -0,0 +1,64 @@
+import sys
+import time
+import types
+import random
+import threading
+from bench_team_cache import sample_team_data
+from throttle import TokenBucket, CircuitBreaker
+
+
+class FakeScraper:
+    def __init__(self, median_latency=8.0, sigma=0.5, failure_rate=0.05, timeout_rate=0.01,
+                 timeout_latency=60.0, time_scale=1.0):
+        """
+        Drop-in replacement for Tracker.get_team_data with a configurable latency distribution
+
+        :param median_latency: Median scrape time in seconds (log-normal distribution)
+        :param sigma: Log-normal shape; larger values give a longer tail
+        :param failure_rate: Fraction of scrapes that fail like a page that did not load
+        :param timeout_rate: Fraction of scrapes that hang for timeout_latency and then fail
+        :param timeout_latency: Seconds a hung scrape takes
+        :param time_scale: Multiplier on all sleeps, e.g. 0.1 to compress a run
+        """
+        self.median_latency = median_latency
+        self.sigma = sigma
+        self.failure_rate = failure_rate
+        self.timeout_rate = timeout_rate
+        self.timeout_latency = timeout_latency
+        self.time_scale = time_scale
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def get_team_data(self, team_id, headless=False, logging_level='minimal', progress_callback=None,
+                      deadline=60, cancel_event=None):
+        with self._lock:
+            self.calls += 1
+        roll = random.random()
+        if roll < self.timeout_rate:
+            time.sleep(self.timeout_latency * self.time_scale)
+            return {'status': 'error', 'message': 'Invalid tracker ID or page did not load'}
+
+        latency = random.lognormvariate(0, self.sigma) * self.median_latency * self.time_scale
+        for phase in ('loading_page', 'reading_matches', 'reading_match_stats'):
+            if progress_callback:
+                progress_callback(phase)
+            time.sleep(latency / 3)
+
+        if roll < self.timeout_rate + self.failure_rate:
+            return {'status': 'error', 'message': 'Invalid tracker ID or page did not load'}
+        data = sample_team_data()
+        data['team_name'] = f"Team {team_id}"
+        return data
+
+    def install(self):
+        """
+        Register a stand-in Tracker module so importing app never loads Selenium or Chrome
+
+        Must run before app is imported.
+        """
+        module = types.ModuleType('Tracker')
+        module.get_team_data = self.get_team_data
+        module.tracker_circuit = CircuitBreaker(failure_threshold=5, reset_timeout=60)
+        module.tracker_rate_limiter = TokenBucket(rate=1000, capacity=1000)
+        sys.modules['Tracker'] = module
+        return module
@@ -0,0 +1,134 @@
+import json
+import time
+import uuid
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Namespace so the same email always maps to the same fake user ID
+USER_NAMESPACE = uuid.UUID('7d0b6f3e-2f4c-4c1e-9a55-3f1d2c0a9b10')
+
+
+class FakeSupabase:
+    def __init__(self, team_ids, latency=0.02, jitter=0.01, failure_rate=0.0, host='127.0.0.1', port=0):
+        """
+        Minimal local stand-in for the Supabase auth and profiles APIs
+
+        :param team_ids: Tracker IDs handed out to fake users' profiles
+        :param latency: Mean added latency per call in seconds
+        :param jitter: Uniform +/- jitter around the latency
+        :param failure_rate: Fraction of calls answered with a 503
+        :param host: Interface to bind
+        :param port: Port to bind, 0 picks a free one
+        """
+        self.team_ids = list(team_ids)
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.users = {}
+        self.profiles = {}
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name='fake-supabase', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def user_for(self, email):
+        """Create the fake user and profile for an email on first use"""
+        user_id = str(uuid.uuid5(USER_NAMESPACE, email))
+        with self._lock:
+            if user_id not in self.users:
+                self.users[user_id] = {"id": user_id, "email": email, "aud": "authenticated"}
+                self.profiles[user_id] = {
+                    "id": user_id,
+                    "first_name": email.split('@')[0],
+                    "team_id": self.team_ids[len(self.profiles) % len(self.team_ids)],
+                    "balance": 0,
+                    "matches_played": 0,
+                    "wins": 0
+                }
+            return self.users[user_id]
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _delay(self):
+                time.sleep(max(0, fake.latency + random.uniform(-fake.jitter, fake.jitter)))
+
+            def _send(self, status, payload=None):
+                body = json.dumps(payload if payload is not None else {}).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _body(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                return json.loads(self.rfile.read(length) or b'{}')
+
+            def _route(self, method):
+                self._delay()
+                if random.random() < fake.failure_rate:
+                    return self._send(503, {"msg": "injected failure"})
+
+                parsed = urlparse(self.path)
+                path, query = parsed.path, parse_qs(parsed.query)
+
+                if method == 'POST' and path in ('/auth/v1/token', '/auth/v1/signup'):
+                    user = fake.user_for(self._body().get('email', 'anonymous@example.com'))
+                    if path == '/auth/v1/signup':
+                        return self._send(200, dict(user, confirmation_sent_at=None))
+                    return self._send(200, {"access_token": "fake", "token_type": "bearer", "user": user})
+
+                if method == 'GET' and path == '/auth/v1/user':
+                    # Token-to-user lookups are not modelled; any bearer token is the first user
+                    user = next(iter(fake.users.values()), None)
+                    return self._send(200, user) if user else self._send(401, {"msg": "invalid token"})
+
+                if method == 'GET' and path.startswith('/auth/v1/user/'):
+                    user = fake.users.get(path.rsplit('/', 1)[-1])
+                    return self._send(200, user) if user else self._send(404, {"msg": "not found"})
+
+                if method == 'DELETE' and path.startswith('/auth/v1/user/'):
+                    return self._send(200, {})
+
+                if path == '/rest/v1/profiles':
+                    if method == 'POST':
+                        profile = self._body()
+                        fake.profiles[profile.get('id')] = profile
+                        return self._send(201, {})
+                    user_id = query.get('id', [''])[0].replace('eq.', '', 1)
+                    profile = fake.profiles.get(user_id)
+                    return self._send(200, [profile] if profile else [])
+
+                return self._send(404, {"msg": f"{method} {path} is not faked"})
+
+            def do_GET(self):
+                self._route('GET')
+
+            def do_POST(self):
+                self._route('POST')
+
+            def do_DELETE(self):
+                self._route('DELETE')
+
+        return Handler
@@ -0,0 +1,243 @@
+"""
+Offline load test for the API
+
+Starts a fake Supabase, swaps the Chrome scraper for a fake with a configurable latency
+distribution, serves app.py on a local port and replays a weighted mix of client traffic
+against it. Run from the server directory:
+
+    python -m loadtest.run --users 50 --duration 60 --time-scale 0.1
+"""
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import threading
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
+
+import requests
+from werkzeug.serving import make_server
+
+from loadtest.fake_supabase import FakeSupabase
+from loadtest.fake_scraper import FakeScraper
+
+SCENARIOS = ('login', 'protected', 'team_info', 'match')
+DEFAULT_MIX = 'login=0.05,protected=0.45,team_info=0.35,match=0.15'
+
+
+class Recorder:
+    def __init__(self):
+        """Latency samples and error counts per operation, shared by all virtual users"""
+        self.latencies = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def record(self, operation, seconds, ok):
+        with self._lock:
+            self.latencies.setdefault(operation, []).append(seconds)
+            if not ok:
+                self.errors[operation] = self.errors.get(operation, 0) + 1
+
+    def report(self, elapsed):
+        """Throughput, latency percentiles in milliseconds and error rate per operation"""
+        with self._lock:
+            rows = {}
+            for operation, samples in sorted(self.latencies.items()):
+                samples = sorted(samples)
+                errors = self.errors.get(operation, 0)
+                rows[operation] = {
+                    'count': len(samples),
+                    'throughput': round(len(samples) / elapsed, 2),
+                    'p50_ms': round(percentile(samples, 0.50) * 1000, 1),
+                    'p95_ms': round(percentile(samples, 0.95) * 1000, 1),
+                    'p99_ms': round(percentile(samples, 0.99) * 1000, 1),
+                    'error_rate': round(errors / len(samples), 4)
+                }
+            return rows
+
+
+def percentile(sorted_samples, quantile):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_samples:
+        return 0
+    index = min(len(sorted_samples) - 1, max(0, int(round(quantile * len(sorted_samples))) - 1))
+    return sorted_samples[index]
+
+
+def parse_mix(value):
+    """Parse 'name=weight,...' into a dictionary of scenario weights"""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"Unknown scenario: {name.strip()}")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+class VirtualUser:
+    def __init__(self, index, base_url, recorder, team_ids, args):
+        """One simulated client with its own session and cookie jar"""
+        self.base_url = base_url
+        self.recorder = recorder
+        self.team_ids = team_ids
+        self.args = args
+        self.email = f"loadtest-{index}@example.com"
+        self.session = requests.Session()
+
+    def call(self, operation, method, path, ok_statuses=(200,), **kwargs):
+        """Time one request and record it; transport errors count as failures"""
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=self.args.request_timeout, **kwargs)
+        except requests.RequestException:
+            self.recorder.record(operation, time.perf_counter() - start, False)
+            return None
+        self.recorder.record(operation, time.perf_counter() - start, response.status_code in ok_statuses)
+        return response
+
+    def login(self):
+        self.call('login', 'POST', '/login', json={"email": self.email, "password": "loadtest"})
+
+    def protected(self):
+        self.call('protected', 'GET', '/protected')
+
+    def team_info(self):
+        """Poll /team-info the way the dashboard does until the data is ready"""
+        team_id = random.choice(self.team_ids)
+        start = time.perf_counter()
+        for _ in range(self.args.max_polls):
+            response = self.call('team_info_poll', 'GET', '/team-info', params={"team_id": team_id})
+            if response is None or response.status_code != 200:
+                break
+            if response.json().get('status') != 'pending':
+                self.recorder.record('team_info_ready', time.perf_counter() - start, response.json().get('status') == 'success')
+                return
+            time.sleep(self.args.poll_interval)
+        self.recorder.record('team_info_ready', time.perf_counter() - start, False)
+
+    def match(self):
+        """Create a match between two random teams and read its result and stats once"""
+        # Players are tracker IDs, and the fake scraper names each team after its ID
+        player_1, player_2 = random.sample(self.team_ids, 2)
+        response = self.call('create_match', 'POST', '/create-match', json={
+            "player_1": player_1,
+            "player_2": player_2,
+            "team_A": f"Team {player_1}",
+            "team_B": f"Team {player_2}"
+        })
+        if response is None or response.status_code != 200:
+            return
+        match_code = response.json().get('match_code')
+        self.call('match_result', 'GET', '/match-result', params={"match_code": match_code})
+        self.call('match_stats', 'GET', '/match-stats', params={"match_code": match_code})
+
+    def run(self, deadline, mix):
+        scenarios = list(mix)
+        weights = [mix[name] for name in scenarios]
+        self.login()
+        while time.monotonic() < deadline:
+            getattr(self, random.choices(scenarios, weights)[0])()
+            time.sleep(random.uniform(0, self.args.think_time * 2))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=20, help='Concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds to generate traffic for')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"Scenario weights (default {DEFAULT_MIX})")
+    parser.add_argument('--teams', type=int, default=50, help='Distinct tracker IDs in play')
+    parser.add_argument('--think-time', type=float, default=0.5, help='Mean pause between a user\'s scenarios')
+    parser.add_argument('--poll-interval', type=float, default=0.5, help='Seconds between /team-info polls')
+    parser.add_argument('--max-polls', type=int, default=120, help='Polls before a team-info wait counts as failed')
+    parser.add_argument('--request-timeout', type=float, default=30, help='Client timeout per request')
+    parser.add_argument('--scrape-median', type=float, default=8.0, help='Median fake scrape time in seconds')
+    parser.add_argument('--scrape-sigma', type=float, default=0.5, help='Log-normal shape of the scrape time')
+    parser.add_argument('--scrape-failure-rate', type=float, default=0.05)
+    parser.add_argument('--scrape-timeout-rate', type=float, default=0.01)
+    parser.add_argument('--time-scale', type=float, default=1.0, help='Multiplier on fake scrape times')
+    parser.add_argument('--supabase-latency', type=float, default=0.02, help='Mean fake Supabase latency in seconds')
+    parser.add_argument('--supabase-failure-rate', type=float, default=0.0)
+    parser.add_argument('--scrape-workers', type=int, default=3, help='SCRAPE_WORKERS for the app under test')
+    parser.add_argument('--max-error-rate', type=float, default=0.1, help='Exit non-zero if any operation errors more often')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    return parser.parse_args(argv)
+
+
+def print_table(rows, elapsed):
+    print(f"\n{'operation':<16}{'count':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>9}")
+    for operation, row in rows.items():
+        print(
+            f"{operation:<16}{row['count']:>8}{row['throughput']:>9}{row['p50_ms']:>10}"
+            f"{row['p95_ms']:>10}{row['p99_ms']:>10}{row['error_rate']:>9.2%}"
+        )
+    print(f"\n{sum(row['count'] for row in rows.values())} requests in {elapsed:.1f}s")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    team_ids = [f"lt{index:06d}" for index in range(max(2, args.teams))]
+
+    fake_supabase = FakeSupabase(
+        team_ids, latency=args.supabase_latency, jitter=args.supabase_latency / 2,
+        failure_rate=args.supabase_failure_rate
+    ).start()
+    fake_scraper = FakeScraper(
+        median_latency=args.scrape_median, sigma=args.scrape_sigma, failure_rate=args.scrape_failure_rate,
+        timeout_rate=args.scrape_timeout_rate, time_scale=args.time_scale
+    )
+    fake_scraper.install()
+
+    # The app reads its configuration at import time
+    os.environ['SUPABASE_URL'] = fake_supabase.url
+    os.environ['SUPABASE_KEY'] = 'loadtest'
+    os.environ['FLASK_ENV'] = 'development'
+    os.environ['SCRAPE_WORKERS'] = str(args.scrape_workers)
+    os.environ.pop('SUPABASE_JWT_SECRET', None)
+    # Keep the app's log lines off stdout, where the report goes, and out of the committed tracker.log
+    os.environ['LOG_STREAM'] = 'stderr'
+    os.environ['LOG_FILE'] = ''
+    import app as app_module
+    logging.getLogger().setLevel(logging.WARNING)
+
+    server = make_server('127.0.0.1', 0, app_module.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='app-under-test', daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    recorder = Recorder()
+    deadline = time.monotonic() + args.duration
+    users = [VirtualUser(index, base_url, recorder, team_ids, args) for index in range(args.users)]
+    threads = [threading.Thread(target=user.run, args=(deadline, args.mix), daemon=True) for user in users]
+
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    rows = recorder.report(elapsed)
+    server.shutdown()
+    fake_supabase.stop()
+
+    if args.json:
+        print(json.dumps({
+            'elapsed': round(elapsed, 2),
+            'users': args.users,
+            'scrapes': fake_scraper.calls,
+            'operations': rows
+        }, indent=2))
+    else:
+        print_table(rows, elapsed)
+        print(f"{fake_scraper.calls} fake scrapes")
+
+    return 1 if any(row['error_rate'] > args.max_error_rate for row in rows.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
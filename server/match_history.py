@@ -0,0 +1,432 @@
+import os
+import re
+import time
+import logging
+import threading
+from datetime import datetime
+import numpy as np
+
+logger = logging.getLogger('match_history')
+
+# Results are stored as small integers so they can be counted and diffed as arrays
+RESULT_CODES = {'Win': 1, 'Draw': 0, 'Loss': -1}
+RESULT_NAMES = {code: name for name, code in RESULT_CODES.items()}
+
+RELATIVE_DATE = re.compile(r'(\d+|an?)\s*(sec|min|hour|hr|day|week|month|year|[smhdwy])\w*\s+ago', re.IGNORECASE)
+UNIT_SECONDS = {
+    's': 1, 'sec': 1, 'm': 60, 'min': 60, 'h': 3600, 'hour': 3600, 'hr': 3600,
+    'd': 86400, 'day': 86400, 'w': 604800, 'week': 604800, 'month': 2592000,
+    'y': 31536000, 'year': 31536000
+}
+ABSOLUTE_DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%b %d, %Y', '%d %b %Y', '%B %d, %Y')
+
+# Card dates are only as precise as their unit ("1 day ago") and each team's page is scraped
+# at its own time, so the two copies of a match can disagree on when it was played by this much
+MIRROR_WINDOW = 2 * 86400
+# Side of results reported outside a scrape, such as resolved platform matches
+PLATFORM_SIDE = '@platform'
+
+COLUMNS = {
+    'game_number': np.int64,
+    'played_at': np.float64,
+    'goals_for': np.int16,
+    'goals_against': np.int16,
+    'result': np.int8,
+    'opponent': np.int32
+}
+
+
+def parse_played_at(date_text, scraped_at):
+    """
+    Best estimate of when a match was played, as a Unix timestamp
+
+    Match cards show dates like "3 hours ago"; those are resolved against the scrape time.
+    Anything unrecognised is treated as played at the scrape time.
+    """
+    if not date_text:
+        return scraped_at
+    text = date_text.strip().lower()
+    if text in ('just now', 'now', 'today'):
+        return scraped_at
+    if text == 'yesterday':
+        return scraped_at - UNIT_SECONDS['day']
+
+    match = RELATIVE_DATE.search(text)
+    if match:
+        amount = 1 if match.group(1) in ('a', 'an') else int(match.group(1))
+        return scraped_at - amount * UNIT_SECONDS[match.group(2)]
+
+    for date_format in ABSOLUTE_DATE_FORMATS:
+        try:
+            return datetime.strptime(date_text.strip(), date_format).timestamp()
+        except ValueError:
+            continue
+    return scraped_at
+
+
+class MirrorIndex:
+    def __init__(self, window=MIRROR_WINDOW):
+        """
+        Recognises the copies of one match that were seen from different sides
+
+        Cards carry no match ID and their dates are relative to each scrape, so the two teams'
+        pages only agree on the team pair and the score. Two sightings are taken to be the same
+        match when those agree, they come from different sides and their played_at estimates
+        are within window seconds of each other. Not thread-safe; owners call it under their lock.
+
+        :param window: Largest gap between two sightings' played_at for them to be one match
+        """
+        self.window = window
+        # (first team, second team, first team's goals, second team's goals) -> [[played_at, [sides]], ...]
+        self._matches = {}
+
+    @staticmethod
+    def _key(team, opponent, goals_for, goals_against):
+        (first, first_goals), (second, second_goals) = sorted([(team, goals_for), (opponent, goals_against)])
+        return first, second, first_goals, second_goals
+
+    def add(self, team, opponent, goals_for, goals_against, played_at, side=None):
+        """
+        Record one sighting of a match
+
+        :param side: Where the sighting came from; defaults to team, the page the card was on.
+            Results reported outside a scrape use PLATFORM_SIDE
+        :return: True if this is a new match, False if it is another side's copy of one already seen
+        """
+        side = side or team
+        sightings = self._matches.setdefault(self._key(team, opponent, goals_for, goals_against), [])
+        closest = None
+        for sighting in sightings:
+            gap = abs(sighting[0] - played_at)
+            if side not in sighting[1] and gap <= self.window and (closest is None or gap < closest[0]):
+                closest = (gap, sighting)
+        if closest is not None:
+            closest[1][1].append(side)
+            return False
+        sightings.append([played_at, [side]])
+        return True
+
+    def prune(self, cutoff):
+        """Forget matches played before cutoff"""
+        for key in list(self._matches):
+            kept = [sighting for sighting in self._matches[key] if sighting[0] >= cutoff]
+            if kept:
+                self._matches[key] = kept
+            else:
+                del self._matches[key]
+
+    def to_list(self):
+        """Remembered matches as JSON-friendly lists, for saving"""
+        return [list(key) + sighting for key, sightings in self._matches.items() for sighting in sightings]
+
+    @classmethod
+    def from_list(cls, entries, window=MIRROR_WINDOW):
+        """Rebuild an index saved with to_list()"""
+        index = cls(window)
+        for first, second, first_goals, second_goals, played_at, sides in entries:
+            index._matches.setdefault((first, second, first_goals, second_goals), []).append([played_at, list(sides)])
+        return index
+
+    def __len__(self):
+        return sum(len(sightings) for sightings in self._matches.values())
+
+
+def scraped_matches(team_id, data, scraped_at=None):
+    """
+    Normalise the match cards of one scrape result into history rows
+
+    Cards are listed newest first, so when the overview's games_played is known each card's
+    game_number (its position in the team's whole history) is exact. The card's own index is
+    used rather than its place in the list, since cards that failed to parse are left out.
+    """
+    scraped_at = scraped_at or time.time()
+    if not data or data.get('status') != 'success':
+        return []
+
+    games_played = (data.get('team_stats') or {}).get('games_played')
+    team_name = data.get('team_name') or team_id
+    rows = []
+    for position, match in enumerate(data.get('matches') or []):
+        result = RESULT_CODES.get(match.get('result'))
+        if result is None or match.get('home_score') is None or match.get('away_score') is None:
+            continue
+        played_at = parse_played_at(match.get('date'), scraped_at)
+        opponent = match.get('away_team') or 'Unknown'
+        rows.append({
+            'team_id': team_id,
+            'team_name': team_name,
+            'opponent': opponent,
+            'goals_for': int(match['home_score']),
+            'goals_against': int(match['away_score']),
+            'result': match['result'],
+            'game_number': games_played - match.get('index', position) if games_played else -1,
+            'played_at': played_at
+        })
+    return rows
+
+
+class TeamHistory:
+    def __init__(self, columns=None, opponents=None, team_name=None):
+        """
+        Every known match of one team as parallel NumPy columns, oldest first
+
+        Opponent names are dictionary-encoded: the opponent column holds indexes into
+        the opponents list.
+        """
+        self.team_name = team_name
+        self.size = 0
+        self.columns = {name: np.empty(16, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self.opponents = list(opponents or [])
+        self._opponent_codes = {name: code for code, name in enumerate(self.opponents)}
+        self._keys = set()
+        if columns is not None:
+            self.size = len(columns['result'])
+            self.columns = {name: np.asarray(columns[name], dtype=dtype) for name, dtype in COLUMNS.items()}
+            numbered = self.columns['game_number'] >= 0
+            self._keys.update(self.columns['game_number'][numbered].tolist())
+            for index in np.flatnonzero(~numbered):
+                self._keys.add(self._key_at(index))
+
+    def column(self, name):
+        """View of the filled part of a column"""
+        return self.columns[name][:self.size]
+
+    def _key_at(self, index):
+        return (
+            int(self.columns['played_at'][index] // 86400), int(self.columns['opponent'][index]),
+            int(self.columns['goals_for'][index]), int(self.columns['goals_against'][index])
+        )
+
+    def _key_for(self, row, opponent_code):
+        if row['game_number'] >= 0:
+            return row['game_number']
+        return (int(row['played_at'] // 86400), opponent_code, row['goals_for'], row['goals_against'])
+
+    def append(self, rows):
+        """Add the rows not already present and return them, oldest first"""
+        added = []
+        for row in sorted(rows, key=lambda row: (row['game_number'], row['played_at'])):
+            self.team_name = row['team_name']
+            opponent_code = self._opponent_codes.get(row['opponent'])
+            if opponent_code is None:
+                opponent_code = self._opponent_codes[row['opponent']] = len(self.opponents)
+                self.opponents.append(row['opponent'])
+            key = self._key_for(row, opponent_code)
+            if key in self._keys:
+                continue
+            self._keys.add(key)
+            self._reserve(self.size + 1)
+            values = dict(row, result=RESULT_CODES[row['result']], opponent=opponent_code)
+            for name in COLUMNS:
+                self.columns[name][self.size] = values[name]
+            self.size += 1
+            added.append(row)
+
+        if added:
+            self._sort(self.size - len(added))
+        return added
+
+    def _reserve(self, capacity):
+        current = len(self.columns['result'])
+        if capacity <= current:
+            return
+        # Grow geometrically so appends stay amortised O(1)
+        new_capacity = max(capacity, current * 2)
+        for name, column in self.columns.items():
+            grown = np.empty(new_capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            self.columns[name] = grown
+
+    def _sort(self, start):
+        """Restore playing order after rows were appended from position start"""
+        # New cards arrive newest first and are usually all newer than what is stored,
+        # so sorting just the appended block is enough; otherwise fall back to a full sort
+        game_numbers, played_at = self.column('game_number'), self.column('played_at')
+        if start > 0 and game_numbers[start:].min() <= game_numbers[start - 1]:
+            start = 0
+        order = np.lexsort((played_at[start:], game_numbers[start:])) + start
+        for name in COLUMNS:
+            self.columns[name][start:self.size] = self.columns[name][order]
+
+    def stats(self, window=10, points=20, form_length=5):
+        """
+        Aggregates over the team's full history, computed on whole columns at once
+
+        :param window: Matches per rolling average
+        :param points: Most recent rolling values returned
+        :param form_length: Matches in the form list, newest first
+        """
+        results = self.column('result')
+        goals_for = self.column('goals_for').astype(np.int64)
+        goals_against = self.column('goals_against').astype(np.int64)
+        games = self.size
+        if games == 0:
+            return {'games': 0}
+
+        wins = int(np.count_nonzero(results == 1))
+        draws = int(np.count_nonzero(results == 0))
+        losses = games - wins - draws
+        scored = int(goals_for.sum())
+        conceded = int(goals_against.sum())
+
+        # Current streak: how far back the latest result repeats
+        latest = results[-1]
+        different = np.flatnonzero(results[::-1] != latest)
+        current_streak = int(different[0]) if different.size else games
+
+        return {
+            'games': games,
+            'wins': wins,
+            'draws': draws,
+            'losses': losses,
+            'win_rate': round(wins / games * 100, 1),
+            'goals_for': scored,
+            'goals_against': conceded,
+            'goal_difference': scored - conceded,
+            'avg_goals_for': round(scored / games, 2),
+            'avg_goals_against': round(conceded / games, 2),
+            'clean_sheets': int(np.count_nonzero(goals_against == 0)),
+            'current_streak': {'result': RESULT_NAMES[int(latest)], 'length': current_streak},
+            'longest_win_streak': longest_run(results == 1),
+            'longest_unbeaten_run': longest_run(results >= 0),
+            'form': [RESULT_NAMES[int(code)] for code in results[::-1][:form_length]],
+            'rolling': {
+                'window': window,
+                'goals_for': rolling_mean(goals_for, window)[-points:].round(2).tolist(),
+                'goals_against': rolling_mean(goals_against, window)[-points:].round(2).tolist(),
+                'win_rate': (rolling_mean((results == 1).astype(np.int64), window)[-points:] * 100).round(1).tolist()
+            }
+        }
+
+    def to_arrays(self):
+        """Columns trimmed to size plus the opponent dictionary, for saving"""
+        arrays = {name: self.column(name) for name in COLUMNS}
+        arrays['opponents'] = np.array(self.opponents, dtype=str)
+        arrays['team_name'] = np.array(self.team_name or '')
+        return arrays
+
+
+def longest_run(mask):
+    """Length of the longest run of True values in a boolean array"""
+    if not mask.size:
+        return 0
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return int((ends - starts).max()) if starts.size else 0
+
+
+def rolling_mean(values, window):
+    """Mean of each run of `window` consecutive values, via a cumulative sum"""
+    if values.size < window:
+        return np.array([values.mean()]) if values.size else np.array([])
+    totals = np.cumsum(np.concatenate(([0], values)))
+    return (totals[window:] - totals[:-window]) / window
+
+
+class MatchHistory:
+    def __init__(self, directory=None):
+        """
+        Append-only store of every scraped match, one columnar partition per team
+
+        :param directory: Where each team's partition is saved as <team_id>.npz; None keeps
+            history in memory only
+        """
+        self.directory = directory
+        self._teams = {}
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._load()
+
+    def _load(self):
+        for filename in os.listdir(self.directory):
+            if not filename.endswith('.npz'):
+                continue
+            team_id = filename[:-4]
+            try:
+                with np.load(os.path.join(self.directory, filename)) as arrays:
+                    team_name = str(arrays['team_name']) if 'team_name' in arrays.files else None
+                    self._teams[team_id] = TeamHistory(
+                        {name: arrays[name] for name in COLUMNS}, arrays['opponents'].tolist(), team_name or None
+                    )
+            except Exception as e:
+                logger.error(f"Could not load match history for {team_id}: {str(e)}")
+
+    def ingest(self, team_id, data, scraped_at=None):
+        """
+        Append the matches of a successful scrape that are not already stored
+
+        :return: The newly added rows, oldest first
+        """
+        rows = scraped_matches(team_id, data, scraped_at)
+        if not rows:
+            return []
+        with self._lock:
+            history = self._teams.get(team_id)
+            if history is None:
+                history = self._teams[team_id] = TeamHistory()
+            added = history.append(rows)
+            if added and self.directory:
+                self._save(team_id, history)
+        # Appended in playing order, which order-sensitive consumers such as ratings want
+        return added
+
+    def _save(self, team_id, history):
+        path = os.path.join(self.directory, f"{team_id}.npz")
+        temporary = path + '.tmp.npz'
+        try:
+            np.savez(temporary, **history.to_arrays())
+            os.replace(temporary, path)
+        except OSError as e:
+            logger.error(f"Could not save match history for {team_id}: {str(e)}")
+
+    def team_stats(self, team_id, window=10):
+        """Aggregated history for a team, or None if nothing has been recorded"""
+        with self._lock:
+            history = self._teams.get(team_id)
+            if history is None:
+                return None
+            return history.stats(window=window)
+
+    def team_name(self, team_id):
+        """Name a team last played under, or None if it has no history"""
+        with self._lock:
+            history = self._teams.get(team_id)
+            return history.team_name if history is not None else None
+
+    def export(self):
+        """
+        Every stored match across all teams, oldest first, for re-seeding derived state
+
+        A match between two tracked teams appears once per side; consumers drop the mirror
+        with a MirrorIndex.
+
+        :return: List of (team_name, opponent, goals_for, goals_against, played_at)
+        """
+        with self._lock:
+            partitions = [
+                (history.team_name, list(history.opponents), {name: history.column(name).copy() for name in COLUMNS})
+                for history in self._teams.values() if history.size and history.team_name
+            ]
+
+        matches = []
+        for team_name, opponents, columns in partitions:
+            for opponent, goals_for, goals_against, played_at in zip(
+                    columns['opponent'].tolist(), columns['goals_for'].tolist(),
+                    columns['goals_against'].tolist(), columns['played_at'].tolist()):
+                matches.append((team_name, opponents[opponent], goals_for, goals_against, played_at))
+        matches.sort(key=lambda match: match[-1])
+        return matches
+
+    def __contains__(self, team_id):
+        with self._lock:
+            return team_id in self._teams
+
+    def stats(self):
+        """Partition and row counts, for /status"""
+        with self._lock:
+            return {
+                "teams": len(self._teams),
+                "matches": sum(history.size for history in self._teams.values())
+            }
@@ -0,0 +1,234 @@
+import time
+import string
+import secrets
+import threading
+from datetime import datetime
+
+MATCH_CODE_PREFIX = "ARN"
+# Uppercase letters and digits without look-alikes (0/O, 1/I), 32 symbols
+MATCH_CODE_ALPHABET = ''.join(c for c in string.ascii_uppercase + string.digits if c not in '01OI')
+MATCH_CODE_LENGTH = 6
+
+
+class MatchLookupError(Exception):
+    def __init__(self, message, status_code):
+        """
+        Raised when a match code cannot be resolved to a match
+
+        :param message: Error message safe to return to the client
+        :param status_code: HTTP status the API should respond with
+        """
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def generate_secure_token():
+    """Generate a secure 16 character token"""
+    return ''.join(secrets.choice(string.ascii_letters + string.digits) for _ in range(16))
+
+
+def parse_full_code(full_match_code):
+    """Split 'ARNXXXXXX@[token]' into (match_code, token)"""
+    match_code, separator, token_part = (full_match_code or '').partition('@')
+    if not separator or not match_code or not token_part:
+        raise MatchLookupError("Invalid match code format", 400)
+    return match_code, token_part.strip('[]')
+
+
+class MatchRegistry:
+    def __init__(self, pending_ttl=24 * 60 * 60, finished_ttl=7 * 24 * 60 * 60, sweep_interval=60):
+        """
+        In-memory store of matches with secondary indexes and expiry
+
+        :param pending_ttl: Seconds an unfinished match is kept before it expires
+        :param finished_ttl: Seconds a finished match is kept after its result arrives
+        :param sweep_interval: Minimum seconds between expiry sweeps
+        """
+        self.pending_ttl = pending_ttl
+        self.finished_ttl = finished_ttl
+        self.sweep_interval = sweep_interval
+        self._matches = {}
+        # Insertion-ordered code -> timestamp maps, oldest first, so a sweep stops at the first live entry
+        self._pending_order = {}
+        self._finished_order = {}
+        self._by_player = {}
+        self._by_team = {}
+        self._last_sweep = time.monotonic()
+        self._lock = threading.RLock()
+
+    def create(self, player_1, player_2, team_A, team_B):
+        """
+        Register a new match under a fresh code
+
+        :return: Tuple of (match_code, full_code) where full_code includes the secure token
+        """
+        self.sweep()
+        secure_token = generate_secure_token()
+        with self._lock:
+            match_code = self._allocate_code()
+            self._matches[match_code] = {
+                "player_1": player_1,
+                "player_2": player_2,
+                "team_A": team_A,
+                "team_B": team_B,
+                "created_at": datetime.now().isoformat(),
+                "result_fetched": False,
+                "match_data": None,
+                "secure_token": secure_token,
+                "version": 1
+            }
+            self._pending_order[match_code] = time.monotonic()
+            for player in (player_1, player_2):
+                self._by_player.setdefault(player, set()).add(match_code)
+            for team in (team_A, team_B):
+                self._by_team.setdefault(team, set()).add(match_code)
+        return match_code, f"{match_code}@[{secure_token}]"
+
+    def get(self, match_code):
+        """Match record for a code, or None"""
+        with self._lock:
+            return self._matches.get(match_code)
+
+    def authenticate(self, match_code, token):
+        """
+        Return the match for a code after checking its secure token
+
+        :raises MatchLookupError: If the match does not exist or the token is wrong
+        """
+        match_data = self.get(match_code)
+        if match_data is None:
+            raise MatchLookupError("Match not found", 404)
+        if not secrets.compare_digest(match_data['secure_token'], token or ''):
+            raise MatchLookupError("Invalid token", 403)
+        return match_data
+
+    def lookup(self, full_match_code):
+        """
+        Resolve a full 'ARNXXXXXX@[token]' code in one step
+
+        :return: Tuple of (match_code, match_data)
+        :raises MatchLookupError: If the code is malformed, unknown or has the wrong token
+        """
+        if not full_match_code:
+            raise MatchLookupError("Match code is required", 400)
+        match_code, token = parse_full_code(full_match_code)
+        return match_code, self.authenticate(match_code, token)
+
+    def record_result(self, match_code, match_data):
+        """
+        Store a match's result, bump its version and move it to the finished set
+
+        A result is final once recorded: the leaderboard, ratings and head-to-head index have
+        already counted it, so a second one is refused rather than counted again.
+
+        :raises MatchLookupError: If the match does not exist or already has a result
+        """
+        with self._lock:
+            record = self._matches.get(match_code)
+            if record is None:
+                raise MatchLookupError("Match not found", 404)
+            if record['result_fetched']:
+                raise MatchLookupError("Match result already recorded", 409)
+            record['match_data'] = match_data
+            record['result_fetched'] = True
+            record['updated_at'] = datetime.now().isoformat()
+            record['version'] = record.get('version', 1) + 1
+            self._pending_order.pop(match_code, None)
+            self._finished_order.pop(match_code, None)
+            self._finished_order[match_code] = time.monotonic()
+            return record
+
+    def for_player(self, player_id, open_only=False):
+        """
+        Codes of every known match a player takes part in
+
+        :param open_only: Only matches still waiting on a result
+        """
+        with self._lock:
+            codes = self._by_player.get(player_id, ())
+            if open_only:
+                return {code for code in codes if code in self._pending_order}
+            return set(codes)
+
+    def for_team(self, team):
+        """Codes of every known match a team takes part in"""
+        with self._lock:
+            return set(self._by_team.get(team, ()))
+
+    def open_players(self):
+        """Players with at least one match still waiting on a result"""
+        self.sweep()
+        with self._lock:
+            return {player for player in self._by_player if self.for_player(player, open_only=True)}
+
+    def open_matches(self):
+        """Snapshot of (match_code, match_data) for matches still waiting on a result"""
+        # The resolver and refresh scheduler call this every cycle, so expired matches are dropped
+        # even when no new ones are being created
+        self.sweep()
+        with self._lock:
+            return [(code, self._matches[code]) for code in self._pending_order]
+
+    def sweep(self, force=False):
+        """Drop expired matches, at most once per sweep_interval unless forced"""
+        now = time.monotonic()
+        if not force and now - self._last_sweep < self.sweep_interval:
+            return 0
+        with self._lock:
+            self._last_sweep = now
+            expired = self._expire(self._pending_order, now - self.pending_ttl)
+            expired += self._expire(self._finished_order, now - self.finished_ttl)
+        return expired
+
+    def stats(self):
+        """Counts for /status"""
+        with self._lock:
+            return {
+                "total": len(self._matches),
+                "open": len(self._pending_order),
+                "finished": len(self._finished_order)
+            }
+
+    def __contains__(self, match_code):
+        with self._lock:
+            return match_code in self._matches
+
+    def __len__(self):
+        with self._lock:
+            return len(self._matches)
+
+    def _allocate_code(self):
+        # 32^6 (~1 billion) codes, so retries are rare even with millions of live matches
+        while True:
+            suffix = ''.join(secrets.choice(MATCH_CODE_ALPHABET) for _ in range(MATCH_CODE_LENGTH))
+            match_code = f"{MATCH_CODE_PREFIX}{suffix}"
+            if match_code not in self._matches:
+                return match_code
+
+    def _expire(self, order, cutoff):
+        expired = [code for code, _ in self._iter_older(order, cutoff)]
+        for match_code in expired:
+            del order[match_code]
+            self._remove(match_code)
+        return len(expired)
+
+    @staticmethod
+    def _iter_older(order, cutoff):
+        for match_code, stamp in order.items():
+            if stamp >= cutoff:
+                break
+            yield match_code, stamp
+
+    def _remove(self, match_code):
+        record = self._matches.pop(match_code, None)
+        if record is None:
+            return
+        for index, keys in ((self._by_player, (record['player_1'], record['player_2'])),
+                            (self._by_team, (record['team_A'], record['team_B']))):
+            for key in keys:
+                codes = index.get(key)
+                if codes is not None:
+                    codes.discard(match_code)
+                    if not codes:
+                        del index[key]
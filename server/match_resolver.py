@@ -0,0 +1,183 @@
+import re
+import time
+import logging
+import threading
+import traceback
+from datetime import datetime, timedelta
+
+# Shortest realistic match; snapshots taken before created_at + this cannot contain the result
+MIN_MATCH_DURATION = timedelta(minutes=4)
+
+
+def is_tracker_id(player):
+    """Whether a player ID has the tracker's 8 letters/digits format and so can be scraped"""
+    return isinstance(player, str) and re.match(r'^[a-z0-9]{8}$', player.lower()) is not None
+
+
+def games_played(snapshot):
+    """Total games on a team's tracker page, or None if the scrape did not get it"""
+    if snapshot is None or snapshot.data.get('status') != 'success':
+        return None
+    return snapshot.data.get('team_stats', {}).get('games_played')
+
+
+def find_new_card(snapshot, baseline, opponent_team):
+    """
+    Find the newest match card against an opponent among games played since the baseline
+
+    :param snapshot: Current TeamSnapshot for the player
+    :param baseline: games_played recorded before the match started
+    :param opponent_team: Team name the opponent plays as
+    :return: The match dictionary, or None
+    """
+    played = games_played(snapshot)
+    if played is None or baseline is None or played <= baseline:
+        return None
+    # Cards are newest first, so the games played since the baseline have the lowest indexes;
+    # the card's own index is used since cards that failed to parse are left out of the list
+    for position, match in enumerate(snapshot.data.get('matches', [])):
+        if match.get('index', position) < played - baseline and match.get('away_team') == opponent_team:
+            return match
+    return None
+
+
+class MatchResolver:
+    def __init__(self, registry, team_cache, request_scrapes, on_resolved, interval=60, refresh_after=120):
+        """
+        Background job that fills in open matches from both players' tracker pages
+
+        :param registry: MatchRegistry holding open matches
+        :param team_cache: TeamCache with the latest snapshot per tracker ID
+        :param request_scrapes: Callable taking a list of tracker IDs to refresh
+        :param on_resolved: Callable (match_code, match_data) run when a result is confirmed
+        :param interval: Seconds between resolution cycles
+        :param refresh_after: Age in seconds after which a player's snapshot is re-scraped
+        """
+        self.registry = registry
+        self.team_cache = team_cache
+        self.request_scrapes = request_scrapes
+        self.on_resolved = on_resolved
+        self.interval = interval
+        self.refresh_after = refresh_after
+        # match code -> {tracker ID: games_played before the match}
+        self._baselines = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Run resolution cycles on a daemon thread"""
+        if self._thread is not None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(self.interval)
+                try:
+                    self.run_cycle()
+                except Exception as e:
+                    logging.error(f"Match resolver cycle failed: {str(e)}\n{traceback.format_exc()}")
+
+        self._thread = threading.Thread(target=loop, name='match-resolver', daemon=True)
+        self._thread.start()
+
+    def track(self, match_code):
+        """Capture baselines for a new match and make sure both players get scraped early"""
+        record = self.registry.get(match_code)
+        if record is None:
+            return
+        self._update_baselines(match_code, record)
+        players = [record['player_1'], record['player_2']]
+        self.request_scrapes([p for p in players if is_tracker_id(p) and self._needs_refresh(p)])
+
+    def run_cycle(self):
+        """Check every open match once, scraping each player at most once per cycle"""
+        open_matches = self.registry.open_matches()
+        with self._lock:
+            # Forget baselines of matches that were resolved or expired
+            live = {code for code, _ in open_matches}
+            for code in list(self._baselines):
+                if code not in live:
+                    del self._baselines[code]
+
+        stale = set()
+        resolved = 0
+        for match_code, record in open_matches:
+            if not (is_tracker_id(record['player_1']) and is_tracker_id(record['player_2'])):
+                # Can never be resolved from tracker pages; scraping would only feed the circuit breaker failures
+                continue
+            baselines = self._update_baselines(match_code, record)
+            if len(baselines) < 2:
+                # Still need a pre-match snapshot for someone; refresh and wait
+                stale.update(p for p in (record['player_1'], record['player_2'])
+                             if p not in baselines and self._needs_refresh(p))
+                continue
+
+            match_data = self.resolve(record, baselines)
+            if match_data is not None:
+                try:
+                    self.on_resolved(match_code, match_data)
+                    resolved += 1
+                except Exception as e:
+                    # Typically a result posted by hand since the cycle started; the rest still get checked
+                    logging.warning(f"Could not store resolved result for {match_code}: {str(e)}")
+                continue
+
+            stale.update(p for p in (record['player_1'], record['player_2']) if self._needs_refresh(p))
+
+        # Teams shared by several open matches appear once in the set
+        if stale:
+            self.request_scrapes(sorted(stale))
+        return resolved
+
+    def resolve(self, record, baselines):
+        """
+        Cross-check both players' tracker pages for the match
+
+        :return: match_data for the registry, or None if the result is not confirmed yet
+        """
+        snapshot_1 = self.team_cache.get(record['player_1'])
+        snapshot_2 = self.team_cache.get(record['player_2'])
+        card_1 = find_new_card(snapshot_1, baselines.get(record['player_1']), record['team_B'])
+        card_2 = find_new_card(snapshot_2, baselines.get(record['player_2']), record['team_A'])
+        if card_1 is None or card_2 is None:
+            return None
+
+        # Each side reports itself as home, so the scores must mirror each other
+        if (card_1['home_score'], card_1['away_score']) != (card_2['away_score'], card_2['home_score']):
+            logging.warning(f"Score mismatch between trackers for {record['team_A']} vs {record['team_B']}")
+            return None
+
+        match_data = {
+            "home_score": card_1['home_score'],
+            "away_score": card_1['away_score'],
+            "result": card_1['result'],
+            "date": card_1.get('date'),
+            "resolved_by": "tracker",
+            "resolved_at": datetime.now().isoformat()
+        }
+
+        # Detailed stats and goals are only scraped for each tracker's most recent match
+        if card_1.get('index') == 0:
+            stats = snapshot_1.data.get('recent_match_stats', {}).get('stats')
+            if stats:
+                match_data['stats'] = stats
+                match_data['goals'] = snapshot_1.data.get('recent_match_goals', [])
+        return match_data
+
+    def _needs_refresh(self, player):
+        snapshot = self.team_cache.get(player)
+        return snapshot is None or snapshot.age() >= self.refresh_after
+
+    def _update_baselines(self, match_code, record):
+        created_at = datetime.fromisoformat(record['created_at'])
+        with self._lock:
+            baselines = self._baselines.setdefault(match_code, {})
+            for player in (record['player_1'], record['player_2']):
+                snapshot = self.team_cache.get(player)
+                # Only a snapshot taken before the match could have finished is a safe baseline;
+                # keep moving it forward while newer ones still qualify
+                if snapshot is not None and snapshot.fetched_at < created_at + MIN_MATCH_DURATION:
+                    played = games_played(snapshot)
+                    if played is not None:
+                        baselines[player] = played
+            return dict(baselines)
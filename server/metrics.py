@@ -0,0 +1,213 @@
+import bisect
+import threading
+
+# Latency buckets in seconds, from fast cache hits up to full Chrome scrapes
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Counter:
+    def __init__(self, name, description, labelnames=()):
+        """
+        Monotonically increasing counter, optionally split by labels
+
+        :param name: Metric name
+        :param description: Human readable description
+        :param labelnames: Names of the labels every sample carries
+        """
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(label, '')) for label in self.labelnames)
+
+    def inc(self, amount=1, **labels):
+        """Increase the counter for the given label values"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        """Current value for the given label values"""
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def snapshot(self):
+        """Copy of all samples keyed by label tuple"""
+        with self._lock:
+            return dict(self._values)
+
+
+class Gauge(Counter):
+    def set(self, value, **labels):
+        """Set the gauge for the given label values"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount=1, **labels):
+        """Decrease the gauge for the given label values"""
+        self.inc(-amount, **labels)
+
+
+class Histogram:
+    def __init__(self, name, description, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """
+        Cumulative histogram of observed values, optionally split by labels
+
+        :param name: Metric name
+        :param description: Human readable description
+        :param labelnames: Names of the labels every sample carries
+        :param buckets: Sorted upper bounds of the histogram buckets
+        """
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(label, '')) for label in self.labelnames)
+
+    def observe(self, value, **labels):
+        """Record a single observation"""
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+                self._series[key] = series
+            series['counts'][index] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def snapshot(self):
+        """Copy of all series keyed by label tuple"""
+        with self._lock:
+            return {
+                key: {'counts': list(series['counts']), 'sum': series['sum'], 'count': series['count']}
+                for key, series in self._series.items()
+            }
+
+    def summary(self):
+        """Count, mean and approximate percentiles for each series, for JSON status output"""
+        result = {}
+        for key, series in self.snapshot().items():
+            label = ','.join(f"{name}={value}" for name, value in zip(self.labelnames, key)) or 'all'
+            count = series['count']
+            result[label] = {
+                'count': count,
+                'mean': round(series['sum'] / count, 4) if count else 0,
+                'p50': self._percentile(series, 0.50),
+                'p95': self._percentile(series, 0.95),
+                'p99': self._percentile(series, 0.99)
+            }
+        return result
+
+    def _percentile(self, series, quantile):
+        """Upper bucket bound containing the given quantile"""
+        target = series['count'] * quantile
+        running = 0
+        for bound, count in zip(self.buckets + (float('inf'),), series['counts']):
+            running += count
+            if running >= target and count:
+                return bound
+        return 0
+
+
+class CallbackGauge:
+    def __init__(self, name, description, callback, labelnames=()):
+        """
+        Gauge whose value is read from a callback at exposition time
+
+        :param name: Metric name
+        :param description: Human readable description
+        :param callback: Returns a number, or a dictionary of label tuple -> number
+        :param labelnames: Names of the labels in the callback's keys
+        """
+        self.name = name
+        self.description = description
+        self.callback = callback
+        self.labelnames = tuple(labelnames)
+        REGISTRY.register(self)
+
+    def snapshot(self):
+        value = self.callback()
+        if isinstance(value, dict):
+            return value
+        return {(): value}
+
+
+class Registry:
+    def __init__(self):
+        """Collection of every metric created in this process"""
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+
+    def metrics(self):
+        with self._lock:
+            return list(self._metrics)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self.metrics():
+            if isinstance(metric, Histogram):
+                kind = 'histogram'
+            elif isinstance(metric, (Gauge, CallbackGauge)):
+                kind = 'gauge'
+            else:
+                kind = 'counter'
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {kind}")
+
+            try:
+                samples = metric.snapshot()
+            except Exception:
+                # A broken callback must not take the whole endpoint down
+                continue
+
+            for key, value in sorted(samples.items()):
+                labels = list(zip(metric.labelnames, key))
+                if kind != 'histogram':
+                    lines.append(f"{metric.name}{_format_labels(labels)} {_format_value(value)}")
+                    continue
+                running = 0
+                for bound, count in zip(metric.buckets + (float('inf'),), value['counts']):
+                    running += count
+                    bucket_labels = labels + [('le', _format_value(bound))]
+                    lines.append(f"{metric.name}_bucket{_format_labels(bucket_labels)} {running}")
+                lines.append(f"{metric.name}_sum{_format_labels(labels)} {_format_value(value['sum'])}")
+                lines.append(f"{metric.name}_count{_format_labels(labels)} {value['count']}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        f'{name}="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for name, value in labels
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
@@ -0,0 +1,91 @@
+import time
+import threading
+from metrics import Counter
+
+PROFILE_CACHE_REQUESTS = Counter(
+    'profile_cache_requests_total',
+    'Profile cache lookups by result',
+    labelnames=('result',)
+)
+
+
+class ProfileCache:
+    def __init__(self, loader, ttl=30, max_entries=10000):
+        """
+        Per-user cache of Supabase profile rows with a short TTL
+
+        :param loader: Callable taking a user ID and returning the profile dict or None
+        :param ttl: Seconds a cached profile stays fresh
+        :param max_entries: Upper bound on cached users before the oldest are evicted
+        """
+        self.loader = loader
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+        # Per-user locks so concurrent misses for the same user share one upstream call
+        self._load_locks = {}
+
+    def get(self, user_id):
+        """Return the profile for a user, loading it from upstream on a miss"""
+        profile = self._fresh(user_id)
+        if profile is not None:
+            PROFILE_CACHE_REQUESTS.inc(result='hit')
+            return profile
+
+        with self._load_lock(user_id):
+            # Another request may have loaded it while we waited
+            profile = self._fresh(user_id)
+            if profile is not None:
+                PROFILE_CACHE_REQUESTS.inc(result='hit')
+                return profile
+
+            PROFILE_CACHE_REQUESTS.inc(result='miss')
+            profile = self.loader(user_id)
+            if profile is not None:
+                self._store(user_id, profile)
+            return profile
+
+    def invalidate(self, user_id):
+        """Drop a user's cached profile, call after any flow that changes it"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def stats(self):
+        """Hit ratio and upstream calls saved, for /status"""
+        hits = PROFILE_CACHE_REQUESTS.value(result='hit')
+        misses = PROFILE_CACHE_REQUESTS.value(result='miss')
+        total = hits + misses
+        with self._lock:
+            size = len(self._entries)
+        return {
+            "entries": size,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / total, 3) if total else 0,
+            "upstream_calls_saved": hits
+        }
+
+    def _fresh(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if entry and time.monotonic() - entry[0] < self.ttl:
+            return entry[1]
+        return None
+
+    def _store(self, user_id, profile):
+        with self._lock:
+            if len(self._entries) >= self.max_entries and user_id not in self._entries:
+                oldest = min(self._entries, key=lambda key: self._entries[key][0])
+                del self._entries[oldest]
+            self._entries[user_id] = (time.monotonic(), profile)
+
+    def _load_lock(self, user_id):
+        with self._lock:
+            lock = self._load_locks.get(user_id)
+            if lock is None:
+                if len(self._load_locks) >= self.max_entries:
+                    # Drop locks nobody is holding so the dict cannot grow without bound
+                    self._load_locks = {key: held for key, held in self._load_locks.items() if held.locked()}
+                lock = self._load_locks[user_id] = threading.Lock()
+            return lock
@@ -0,0 +1,194 @@
+import os
+import json
+import time
+import logging
+import threading
+from match_history import MirrorIndex
+
+logger = logging.getLogger('ratings')
+
+INITIAL_RATING = 1500.0
+K_FACTOR = 32.0
+# Mirrored copies of a match show up within days; matches played before this are forgotten
+FINGERPRINT_RETENTION = 30 * 24 * 60 * 60
+
+
+def expected_score(rating, opponent_rating):
+    """Probability-like expected score of a team against an opponent under Elo"""
+    return 1.0 / (1.0 + 10 ** ((opponent_rating - rating) / 400.0))
+
+
+def actual_score(goals_for, goals_against):
+    """1 for a win, 0.5 for a draw, 0 for a loss"""
+    if goals_for > goals_against:
+        return 1.0
+    if goals_for == goals_against:
+        return 0.5
+    return 0.0
+
+
+def compute_ratings(team_a, team_b, scores, team_count, k_factor=K_FACTOR, initial=INITIAL_RATING):
+    """
+    Replay a whole match stream in one pass, for re-seeding
+
+    Each update depends on the ratings left by the previous one, so the stream cannot be
+    vectorised; instead the loop runs over plain lists with everything bound locally.
+
+    :param team_a: Team index of the first side of each match
+    :param team_b: Team index of the second side of each match
+    :param scores: Actual score of the first side (1, 0.5 or 0) for each match
+    :param team_count: Number of distinct team indexes
+    :return: (ratings, games) lists indexed by team
+    """
+    ratings = [initial] * team_count
+    games = [0] * team_count
+    for a, b, score in zip(team_a, team_b, scores):
+        rating_a = ratings[a]
+        rating_b = ratings[b]
+        expected = 1.0 / (1.0 + 10 ** ((rating_b - rating_a) / 400.0))
+        change = k_factor * (score - expected)
+        ratings[a] = rating_a + change
+        ratings[b] = rating_b - change
+        games[a] += 1
+        games[b] += 1
+    return ratings, games
+
+
+class RatingEngine:
+    def __init__(self, path=None, k_factor=K_FACTOR, initial=INITIAL_RATING, save_interval=30):
+        """
+        Elo ratings per team name, updated one match at a time as matches are scraped or resolved
+
+        :param path: JSON file the rating state is saved to and restored from; None keeps it in memory
+        :param k_factor: Maximum rating change per match
+        :param initial: Rating of a team's first match
+        :param save_interval: Minimum seconds between saves
+        """
+        self.path = path
+        self.k_factor = k_factor
+        self.initial = initial
+        self.save_interval = save_interval
+        # team name -> [rating, games]
+        self._ratings = {}
+        # Every applied match within the retention period, to drop the other side's copy
+        self._seen = MirrorIndex()
+        self._last_save = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.restored = self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+            self._ratings = {team: list(value) for team, value in state['ratings'].items()}
+            self._seen = MirrorIndex.from_list(state['matches'])
+            return True
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Could not restore ratings from {self.path}: {str(e)}")
+            return False
+
+    def record(self, team_a, team_b, goals_a, goals_b, played_at=None, side=None):
+        """
+        Apply one match to both teams' ratings
+
+        :param side: Where the match was seen, see MirrorIndex.add
+        :return: False if the match was already applied from another side
+        """
+        with self._lock:
+            if not self._seen.add(team_a, team_b, goals_a, goals_b, played_at or time.time(), side):
+                return False
+            self._apply(team_a, team_b, actual_score(goals_a, goals_b))
+            self._dirty = True
+        self._maybe_save()
+        return True
+
+    def _apply(self, team_a, team_b, score):
+        state_a = self._ratings.setdefault(team_a, [self.initial, 0])
+        state_b = self._ratings.setdefault(team_b, [self.initial, 0])
+        change = self.k_factor * (score - expected_score(state_a[0], state_b[0]))
+        state_a[0] += change
+        state_b[0] -= change
+        state_a[1] += 1
+        state_b[1] += 1
+
+    def ingest(self, rows):
+        """Apply new MatchHistory rows, skipping matches already seen from the other side"""
+        applied = 0
+        for row in rows:
+            applied += self.record(row['team_name'], row['opponent'], row['goals_for'],
+                                   row['goals_against'], row['played_at'])
+        return applied
+
+    def recompute(self, matches):
+        """
+        Rebuild every rating from a full match stream, replacing the current state
+
+        :param matches: (team_a, team_b, goals_a, goals_b, played_at) tuples as seen from team_a's
+            page, oldest first
+        :return: Number of distinct matches applied
+        """
+        seen = MirrorIndex()
+        team_index = {}
+        team_a, team_b, scores = [], [], []
+        for name_a, name_b, goals_a, goals_b, played_at in matches:
+            if not seen.add(name_a, name_b, goals_a, goals_b, played_at):
+                continue
+            team_a.append(team_index.setdefault(name_a, len(team_index)))
+            team_b.append(team_index.setdefault(name_b, len(team_index)))
+            scores.append(actual_score(goals_a, goals_b))
+
+        ratings, games = compute_ratings(team_a, team_b, scores, len(team_index), self.k_factor, self.initial)
+        with self._lock:
+            self._ratings = {name: [ratings[index], games[index]] for name, index in team_index.items()}
+            self._seen = seen
+            self._dirty = True
+        self.save()
+        return len(scores)
+
+    def rating(self, team_name):
+        """A team's rating and rated match count, or None if it has not played a rated match"""
+        with self._lock:
+            state = self._ratings.get(team_name)
+            if state is None:
+                return None
+            return {"team_name": team_name, "rating": round(state[0], 1), "games": state[1]}
+
+    def win_probability(self, team_name, opponent_name):
+        """Expected score of a team against an opponent, unrated teams count as new"""
+        with self._lock:
+            rating = self._ratings.get(team_name, [self.initial])[0]
+            opponent_rating = self._ratings.get(opponent_name, [self.initial])[0]
+        return round(expected_score(rating, opponent_rating), 3)
+
+    def _maybe_save(self):
+        if time.time() - self._last_save >= self.save_interval:
+            self.save()
+
+    def save(self):
+        """Drop matches past their retention and write the rating state if it changed"""
+        with self._lock:
+            if not self._dirty:
+                return
+            cutoff = time.time() - FINGERPRINT_RETENTION
+            self._seen.prune(cutoff)
+            self._dirty = False
+            self._last_save = time.time()
+            if not self.path:
+                return
+            state = json.dumps({"ratings": self._ratings, "matches": self._seen.to_list()})
+
+        temporary = self.path + '.tmp'
+        try:
+            with open(temporary, 'w') as f:
+                f.write(state)
+            os.replace(temporary, self.path)
+        except OSError as e:
+            logger.error(f"Could not save ratings to {self.path}: {str(e)}")
+
+    def stats(self):
+        """Rated teams and remembered matches, for /status"""
+        with self._lock:
+            return {"teams": len(self._ratings), "matches": len(self._seen)}
@@ -0,0 +1,166 @@
+import math
+import time
+import logging
+import threading
+import traceback
+from collections import deque
+
+
+class TeamActivity:
+    def __init__(self, interval):
+        """Refresh state the scheduler keeps for one team"""
+        self.interval = interval
+        self.last_request = time.time()
+        # Exponentially decayed count of recent requests
+        self.request_score = 0.0
+        self.last_change = None
+
+
+class RefreshScheduler:
+    def __init__(self, team_cache, request_scrapes, open_match_teams, cache_ttl=300,
+                 min_interval=60, max_interval=3600, open_match_interval=90, hot_score=3.0,
+                 activity_window=600, dormant_after=24 * 60 * 60, budget_per_minute=10, tick=10):
+        """
+        Pre-emptively refresh team snapshots, more often for active teams
+
+        :param team_cache: TeamCache holding the snapshots to keep warm
+        :param request_scrapes: Callable taking a list of team IDs to scrape
+        :param open_match_teams: Callable returning the tracker IDs involved in open matches
+        :param cache_ttl: Age at which requests stop being served from cache
+        :param min_interval: Shortest refresh interval for any team
+        :param max_interval: Longest refresh interval before a team counts as dormant
+        :param open_match_interval: Refresh interval cap while a team has an open match
+        :param hot_score: Decayed request count at which a team counts as hot
+        :param activity_window: Seconds over which the request score decays by a factor of e
+        :param dormant_after: Seconds without requests or open matches before a team is dropped
+        :param budget_per_minute: Global cap on scheduler-initiated scrapes
+        :param tick: Seconds between scheduling passes
+        """
+        self.team_cache = team_cache
+        self.request_scrapes = request_scrapes
+        self.open_match_teams = open_match_teams
+        self.cache_ttl = cache_ttl
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.open_match_interval = open_match_interval
+        self.hot_score = hot_score
+        self.activity_window = activity_window
+        self.dormant_after = dormant_after
+        self.budget_per_minute = budget_per_minute
+        self.tick = tick
+        self._teams = {}
+        self._recent_scrapes = deque()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Run scheduling passes on a daemon thread"""
+        if self._thread is not None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(self.tick)
+                try:
+                    self.run_once()
+                except Exception as e:
+                    logging.error(f"Refresh scheduler pass failed: {str(e)}\n{traceback.format_exc()}")
+
+        self._thread = threading.Thread(target=loop, name='refresh-scheduler', daemon=True)
+        self._thread.start()
+
+    def record_request(self, team_id):
+        """Note that a client asked for a team, which keeps it on the refresh list"""
+        now = time.time()
+        with self._lock:
+            activity = self._teams.get(team_id)
+            if activity is None:
+                activity = self._teams[team_id] = TeamActivity(self.cache_ttl)
+            decay = math.exp(-(now - activity.last_request) / self.activity_window)
+            activity.request_score = activity.request_score * decay + 1
+            activity.last_request = now
+
+    def on_snapshot(self, team_id, previous, snapshot):
+        """
+        Adapt a team's interval after a scrape: faster if new matches appeared, slower if not
+
+        A failed scrape says nothing about activity and only backs the team off.
+        """
+        with self._lock:
+            activity = self._teams.get(team_id)
+            if activity is None:
+                return
+            if snapshot.data.get('status') != 'success':
+                activity.interval = min(self.max_interval, activity.interval * 1.5)
+                return
+            changed = previous is None or self._games_played(previous) != self._games_played(snapshot)
+            if changed:
+                activity.interval = max(self.min_interval, activity.interval / 2)
+                activity.last_change = time.time()
+            else:
+                activity.interval = min(self.max_interval, activity.interval * 1.5)
+
+    def interval_for(self, activity, has_open_match, now=None):
+        """Current refresh interval for a team given its activity"""
+        now = now or time.time()
+        interval = activity.interval
+        if has_open_match:
+            interval = min(interval, self.open_match_interval)
+        score = activity.request_score * math.exp(-(now - activity.last_request) / self.activity_window)
+        if score >= self.hot_score:
+            # Refresh hot teams before the cache expires so requests never see a cold entry
+            interval = min(interval, self.cache_ttl * 0.8)
+        return max(self.min_interval, interval)
+
+    def run_once(self):
+        """Queue the most overdue teams, within the global scrape budget"""
+        now = time.time()
+        open_teams = set(self.open_match_teams())
+
+        for team_id in open_teams:
+            with self._lock:
+                if team_id not in self._teams:
+                    self._teams[team_id] = TeamActivity(self.open_match_interval)
+
+        due = []
+        with self._lock:
+            for team_id, activity in list(self._teams.items()):
+                has_open_match = team_id in open_teams
+                if not has_open_match and now - activity.last_request > self.dormant_after:
+                    del self._teams[team_id]
+                    continue
+                # Measured from the last attempt, so a failing team waits like any other
+                attempts = [self.team_cache.get(team_id), self.team_cache.get_failure(team_id)]
+                age = min((attempt.age() for attempt in attempts if attempt is not None), default=float('inf'))
+                interval = self.interval_for(activity, has_open_match, now)
+                if age >= interval:
+                    due.append((age / interval, team_id))
+
+            budget = self._remaining_budget(now)
+            due.sort(reverse=True)
+            selected = [team_id for _, team_id in due[:budget]]
+            for _ in selected:
+                self._recent_scrapes.append(now)
+
+        if selected:
+            self.request_scrapes(selected)
+        return selected
+
+    def stats(self):
+        """Tracked teams and budget use, for /status"""
+        now = time.time()
+        with self._lock:
+            return {
+                "tracked_teams": len(self._teams),
+                "scrapes_last_minute": self.budget_per_minute - self._remaining_budget(now),
+                "budget_per_minute": self.budget_per_minute
+            }
+
+    def _remaining_budget(self, now):
+        while self._recent_scrapes and now - self._recent_scrapes[0] > 60:
+            self._recent_scrapes.popleft()
+        return max(0, self.budget_per_minute - len(self._recent_scrapes))
+
+    @staticmethod
+    def _games_played(snapshot):
+        return snapshot.data.get('team_stats', {}).get('games_played')
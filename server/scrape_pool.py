@@ -0,0 +1,179 @@
+import time
+import logging
+import threading
+import traceback
+from collections import deque
+from metrics import Histogram
+
+# Priority classes, most urgent first
+INTERACTIVE = 'interactive'
+MATCH_RESOLUTION = 'match_resolution'
+BACKGROUND = 'background'
+BACKFILL = 'backfill'
+PRIORITIES = (INTERACTIVE, MATCH_RESOLUTION, BACKGROUND, BACKFILL)
+
+SCRAPE_QUEUE_WAIT = Histogram(
+    'scrape_queue_wait_seconds',
+    'Time a scrape waited for a worker, by priority class',
+    labelnames=('priority',)
+)
+
+
+class ScrapePool:
+    def __init__(self, handler, workers=3, caps=None, aging_interval=30):
+        """
+        Bounded pool of scrape workers with priority classes and de-duplication of queued team IDs
+
+        Each class is FIFO. A free worker takes the head of the most urgent class that is under
+        its concurrency cap, where urgency improves by one class for every aging_interval seconds
+        a job has waited, so low-priority work still makes progress under sustained load.
+
+        :param handler: Callable run with a team ID on a worker thread
+        :param workers: Number of scrapes (and Chrome instances) allowed at once
+        :param caps: Dictionary of priority class to the most workers it may occupy at once;
+            by default background work always leaves one worker free for interactive scrapes
+        :param aging_interval: Seconds of waiting that promote a job by one class
+        """
+        self.handler = handler
+        self.workers = workers
+        self.caps = {
+            INTERACTIVE: workers,
+            MATCH_RESOLUTION: workers,
+            BACKGROUND: max(1, workers - 1),
+            BACKFILL: max(1, workers // 3)
+        }
+        self.caps.update(caps or {})
+        self.aging_interval = aging_interval
+        # priority -> deque of (team_id, queued_at)
+        self._queues = {priority: deque() for priority in PRIORITIES}
+        # team_id -> priority class it is queued under
+        self._queued = {}
+        # team_id -> priority class it is running under
+        self._running = {}
+        self._available = threading.Condition()
+        self._threads = []
+
+    def start(self):
+        """Start the worker threads"""
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"scrape-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, team_id, priority=INTERACTIVE):
+        """
+        Queue a scrape unless one for the same team is already queued or running
+
+        :return: True if a new scrape was queued
+        """
+        return self.submit_many([team_id], priority)[team_id] == 'queued'
+
+    def submit_many(self, team_ids, priority=INTERACTIVE):
+        """
+        Queue scrapes for several teams as a single coalesced job
+
+        A team already queued under a less urgent class is moved up to this one.
+
+        :param team_ids: Team IDs to scrape
+        :param priority: One of PRIORITIES
+        :return: Dictionary of team ID to 'queued' (newly scheduled) or 'in_progress'
+        """
+        if priority not in self._queues:
+            raise ValueError(f"Unknown scrape priority: {priority}")
+
+        statuses = {}
+        now = time.monotonic()
+        with self._available:
+            for team_id in team_ids:
+                if team_id in statuses:
+                    continue
+                if team_id in self._running:
+                    statuses[team_id] = 'in_progress'
+                    continue
+                current = self._queued.get(team_id)
+                if current is not None:
+                    statuses[team_id] = 'in_progress'
+                    if PRIORITIES.index(priority) < PRIORITIES.index(current):
+                        self._promote(team_id, current, priority)
+                    continue
+                self._queued[team_id] = priority
+                self._queues[priority].append((team_id, now))
+                statuses[team_id] = 'queued'
+            self._available.notify_all()
+        return statuses
+
+    def _promote(self, team_id, current, priority):
+        # Keep the original queue time so the wait metric covers the whole wait
+        entries = self._queues[current]
+        for index, (queued_id, queued_at) in enumerate(entries):
+            if queued_id == team_id:
+                del entries[index]
+                break
+        self._queued[team_id] = priority
+        self._queues[priority].append((team_id, queued_at))
+
+    def is_pending(self, team_id):
+        """Whether a scrape for the team is queued or running"""
+        with self._available:
+            return team_id in self._queued or team_id in self._running
+
+    def stats(self):
+        """Queue depth and running scrapes overall and per priority class, for /status"""
+        with self._available:
+            running_by_priority = {priority: 0 for priority in PRIORITIES}
+            for priority in self._running.values():
+                running_by_priority[priority] += 1
+            return {
+                "workers": self.workers,
+                "queued": len(self._queued),
+                "running": len(self._running),
+                "queued_by_priority": {priority: len(entries) for priority, entries in self._queues.items()},
+                "running_by_priority": running_by_priority,
+                "caps": dict(self.caps)
+            }
+
+    def _next_job(self, now):
+        """Head of the most urgent class with spare capacity, or None; called with the lock held"""
+        running_by_priority = {}
+        for priority in self._running.values():
+            running_by_priority[priority] = running_by_priority.get(priority, 0) + 1
+
+        best = None
+        for rank, priority in enumerate(PRIORITIES):
+            entries = self._queues[priority]
+            if not entries or running_by_priority.get(priority, 0) >= self.caps[priority]:
+                continue
+            # Heads have waited longest in their class, so only they need comparing
+            waited = now - entries[0][1]
+            urgency = rank - waited / self.aging_interval
+            if best is None or urgency < best[0]:
+                best = (urgency, priority)
+        if best is None:
+            return None
+
+        priority = best[1]
+        team_id, queued_at = self._queues[priority].popleft()
+        del self._queued[team_id]
+        self._running[team_id] = priority
+        return team_id, priority, now - queued_at
+
+    def _work(self):
+        while True:
+            with self._available:
+                job = self._next_job(time.monotonic())
+                while job is None:
+                    # Woken by new submissions and by finished scrapes freeing a class's cap
+                    self._available.wait()
+                    job = self._next_job(time.monotonic())
+            team_id, priority, waited = job
+            SCRAPE_QUEUE_WAIT.observe(waited, priority=priority)
+            try:
+                self.handler(team_id)
+            except Exception as e:
+                logging.error(f"Scrape worker failed for {team_id}: {str(e)}\n{traceback.format_exc()}")
+            finally:
+                with self._available:
+                    del self._running[team_id]
+                    self._available.notify_all()
@@ -0,0 +1,135 @@
+"""
+Standalone scrape worker
+
+Leases scrape jobs from the shared broker, runs them through the tracker scraper and writes
+the results back for the API nodes to pick up. Start as many as the machine's CPU and RAM
+allow Chrome instances; API nodes must run with the same SCRAPE_BROKER. The tracker rate limit
+and circuit breaker are kept in the broker too, so adding workers does not raise the request
+rate against tracker.ftgames.com.
+
+Usage: python scrape_worker.py [--broker sqlite:///scrape_jobs.db] [--concurrency 2]
+"""
+import os
+import time
+import socket
+import logging
+import argparse
+import threading
+import traceback
+from Tracker import get_team_data, use_shared_throttle, tracker_rate_limiter, tracker_circuit, SCRAPE_DEADLINE
+from job_queue import open_broker
+from scrape_pool import SCRAPE_QUEUE_WAIT
+from structured_logging import setup_logging
+
+logger = logging.getLogger('scrape_worker')
+
+
+class ScrapeWorker:
+    def __init__(self, broker, name, lease_seconds=180, idle_sleep=1.0, headless=True, deadline=SCRAPE_DEADLINE):
+        """
+        One worker loop: lease a job, scrape, store the result, repeat
+
+        :param broker: JobBroker shared with the API nodes
+        :param name: Lease owner name, unique across all workers
+        :param lease_seconds: How long a job stays ours without a renewal
+        :param idle_sleep: Seconds to wait when the queue is empty
+        :param headless: Whether Chrome runs headless
+        :param deadline: Seconds one scrape may take before it is abandoned
+        """
+        self.broker = broker
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.idle_sleep = idle_sleep
+        self.headless = headless
+        self.deadline = deadline
+        self.stopping = threading.Event()
+
+    def run(self):
+        while not self.stopping.is_set():
+            try:
+                job = self.broker.lease(self.name, self.lease_seconds)
+            except Exception as e:
+                logger.error(f"Leasing a job failed: {str(e)}")
+                job = None
+            if job is None:
+                self.stopping.wait(self.idle_sleep)
+                continue
+            self.process(job)
+
+    def process(self, job):
+        SCRAPE_QUEUE_WAIT.observe(max(0, time.time() - job.queued_at), priority=job.priority)
+        fields = {"team_id": job.team_id, "job_id": job.id, "attempt": job.attempts}
+        logger.info("Scrape started", extra={"fields": fields})
+
+        # Keep the lease alive while Chrome works; a crash stops the renewals and frees the job
+        renewing = threading.Event()
+        # Once another worker owns the job our result would be thrown away, so stop scraping
+        lease_lost = threading.Event()
+
+        def renew():
+            while not renewing.wait(self.lease_seconds / 3):
+                if not self.broker.extend(job, self.lease_seconds):
+                    logger.warning("Lease lost to another worker", extra={"fields": fields})
+                    lease_lost.set()
+                    return
+
+        renewer = threading.Thread(target=renew, name=f"{self.name}-lease", daemon=True)
+        renewer.start()
+        try:
+            result = get_team_data(job.team_id, headless=self.headless, logging_level='minimal',
+                                   deadline=self.deadline, cancel_event=lease_lost)
+        except Exception as e:
+            renewing.set()
+            logger.error(f"Scrape crashed: {str(e)}\n{traceback.format_exc()}", extra={"fields": fields})
+            self.broker.release(job, str(e))
+            return
+        renewing.set()
+        if lease_lost.is_set():
+            return
+
+        self.broker.complete(job, result)
+        logger.info("Scrape finished", extra={"fields": dict(fields, status=result.get('status'))})
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run scrape jobs from the shared queue')
+    parser.add_argument('--broker', default=os.environ.get('SCRAPE_BROKER', 'sqlite:///scrape_jobs.db'))
+    parser.add_argument('--concurrency', type=int, default=int(os.environ.get('SCRAPE_WORKERS', 2)),
+                        help='Scrapes (and Chrome instances) run at once by this process')
+    parser.add_argument('--lease', type=int, default=180, help='Lease length in seconds')
+    parser.add_argument('--deadline', type=int, default=int(os.environ.get('SCRAPE_DEADLINE', SCRAPE_DEADLINE)),
+                        help='Seconds one scrape may take before it is abandoned')
+    parser.add_argument('--show-browser', action='store_true', help='Run Chrome with a visible window')
+    args = parser.parse_args()
+
+    setup_logging(lambda: (None, None), log_file='scrape_worker.log')
+    broker = open_broker(args.broker)
+    # One rate limit and one breaker for all workers, however many processes are started
+    use_shared_throttle(
+        broker.rate_limiter('tracker', tracker_rate_limiter.rate, tracker_rate_limiter.capacity),
+        broker.circuit_breaker('tracker', tracker_circuit.failure_threshold, tracker_circuit.reset_timeout)
+    )
+    prefix = f"{socket.gethostname()}-{os.getpid()}"
+    workers = [
+        ScrapeWorker(broker, f"{prefix}-{index}", lease_seconds=args.lease, headless=not args.show_browser,
+                     deadline=args.deadline)
+        for index in range(args.concurrency)
+    ]
+    threads = [threading.Thread(target=worker.run, name=worker.name, daemon=True) for worker in workers]
+    for thread in threads:
+        thread.start()
+    logger.info("Scrape worker started", extra={"fields": {"broker": args.broker, "concurrency": args.concurrency}})
+
+    try:
+        while any(thread.is_alive() for thread in threads):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        # Finish the scrapes in progress, each bounded by its deadline; unleased jobs stay queued for other workers
+        for worker in workers:
+            worker.stopping.set()
+        for thread in threads:
+            thread.join()
+
+
+if __name__ == '__main__':
+    main()
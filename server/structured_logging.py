@@ -0,0 +1,141 @@
+import sys
+import json
+import queue
+import random
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+
+# Field names whose values are never written out
+SENSITIVE_KEYS = {
+    'authorization', 'cookie', 'cookies', 'set-cookie', 'access_token', 'refresh_token',
+    'token', 'password', 'apikey', 'secure_token', 'jwt', 'x-csrf-token'
+}
+REDACTED = '[REDACTED]'
+
+
+def redact(value):
+    """Copy of a value with sensitive fields replaced, recursing into dicts and lists"""
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if str(key).lower() in SENSITIVE_KEYS else redact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    return value
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        """One JSON object per line with the message, context and any extra fields"""
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        for attribute in ('request_id', 'route'):
+            value = getattr(record, attribute, None)
+            if value:
+                entry[attribute] = value
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(redact(fields))
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class RequestContextFilter(logging.Filter):
+    def __init__(self, context_provider):
+        """
+        Attach the current request ID and route to every record
+
+        :param context_provider: Callable returning (request_id, route) or (None, None)
+        """
+        super().__init__()
+        self.context_provider = context_provider
+
+    def filter(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id, record.route = self.context_provider()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    def __init__(self, route_rates, default_rate=1.0):
+        """
+        Keep only a fraction of INFO/DEBUG records per route; warnings and errors always pass
+
+        :param route_rates: Dictionary of route rule to the fraction of records to keep
+        :param default_rate: Fraction kept for routes not listed
+        """
+        super().__init__()
+        self.route_rates = route_rates
+        self.default_rate = default_rate
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.route_rates.get(getattr(record, 'route', None), self.default_rate)
+        return rate >= 1 or random.random() < rate
+
+
+def setup_logging(context_provider, route_rates=None, level=logging.INFO, log_file=None, queue_size=10000, stream=None):
+    """
+    Route all logging through a bounded queue drained by a background thread
+
+    Request threads only tag, sample and enqueue records; the listener thread does the
+    JSON encoding and the blocking writes. When the queue is full, records are dropped rather
+    than stalling requests.
+
+    :param context_provider: Callable returning (request_id, route) for the current thread
+    :param route_rates: Per-route sampling rates for INFO/DEBUG records
+    :param level: Root log level
+    :param log_file: Optional file to write alongside the stream
+    :param queue_size: Records buffered before new ones are dropped
+    :param stream: Where records are printed, stdout by default
+    :return: The started QueueListener
+    """
+    formatter = JsonFormatter()
+    outputs = [logging.StreamHandler(stream or sys.stdout)]
+    if log_file:
+        outputs.append(logging.FileHandler(log_file))
+    for handler in outputs:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    queue_handler = DroppingQueueHandler(log_queue)
+    # Context is captured on the calling thread, sampling happens before anything is queued
+    queue_handler.addFilter(RequestContextFilter(context_provider))
+    queue_handler.addFilter(SamplingFilter(route_rates or {}))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = logging.handlers.QueueListener(log_queue, *outputs, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Resolve the message now, but leave JSON formatting to the listener thread
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
@@ -0,0 +1,112 @@
+import re
+import time
+import random
+import requests
+from requests.adapters import HTTPAdapter
+from metrics import Histogram, Counter
+
+# (connect, read) timeouts in seconds applied to every Supabase call
+DEFAULT_TIMEOUT = (3.05, 10)
+# Responses worth retrying on an idempotent request
+RETRYABLE_STATUS_CODES = {429, 502, 503, 504}
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+SUPABASE_LATENCY = Histogram(
+    'supabase_request_seconds',
+    'Latency of Supabase HTTP calls',
+    labelnames=('endpoint', 'method', 'outcome')
+)
+SUPABASE_RETRIES = Counter(
+    'supabase_retries_total',
+    'Supabase calls retried after a transient failure',
+    labelnames=('endpoint', 'method')
+)
+
+# Path segments that identify a single row or user, collapsed so metrics stay low-cardinality
+_ID_SEGMENT = re.compile(r'/[0-9a-fA-F-]{16,}(?=/|$)')
+
+
+def endpoint_label(path):
+    """Turn a request path into a metrics label, e.g. /auth/v1/user/<uuid> -> /auth/v1/user/:id"""
+    path = path.split('?', 1)[0]
+    return _ID_SEGMENT.sub('/:id', path)
+
+
+class SupabaseClient:
+    def __init__(self, url, key, timeout=DEFAULT_TIMEOUT, max_retries=2, backoff=0.2, pool_size=20):
+        """
+        Shared HTTP client for Supabase with connection pooling, timeouts and retries
+
+        :param url: Supabase project URL
+        :param key: Supabase API key sent as the apikey header
+        :param timeout: Default (connect, read) timeout for every call
+        :param max_retries: Extra attempts for idempotent requests that fail transiently
+        :param backoff: Base delay in seconds for exponential backoff with full jitter
+        :param pool_size: Keep-alive connections kept open to Supabase
+        """
+        self.url = (url or '').rstrip('/')
+        self.key = key
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+        # One pooled session reuses TCP+TLS connections across requests and threads
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({'apikey': key or ''})
+
+    def service_headers(self, extra=None):
+        """Headers authorising a call with the service key"""
+        headers = {'Authorization': f"Bearer {self.key}"}
+        if extra:
+            headers.update(extra)
+        return headers
+
+    def request(self, method, path, timeout=None, retry=None, **kwargs):
+        """
+        Send a request to Supabase
+
+        :param method: HTTP method
+        :param path: Path relative to the project URL, e.g. /rest/v1/profiles
+        :param timeout: Override for the default timeout
+        :param retry: Force retries on or off, defaults to retrying idempotent methods only
+        :return: requests.Response
+        """
+        method = method.upper()
+        endpoint = endpoint_label(path)
+        if retry is None:
+            retry = method in IDEMPOTENT_METHODS
+        attempts = 1 + (self.max_retries if retry else 0)
+
+        for attempt in range(attempts):
+            start = time.perf_counter()
+            try:
+                response = self.session.request(
+                    method, f"{self.url}{path}", timeout=timeout or self.timeout, **kwargs
+                )
+            except (requests.ConnectionError, requests.Timeout):
+                SUPABASE_LATENCY.observe(time.perf_counter() - start,
+                                         endpoint=endpoint, method=method, outcome='error')
+                if attempt + 1 >= attempts:
+                    raise
+            else:
+                outcome = 'ok' if response.status_code < 500 else 'error'
+                SUPABASE_LATENCY.observe(time.perf_counter() - start,
+                                         endpoint=endpoint, method=method, outcome=outcome)
+                if response.status_code not in RETRYABLE_STATUS_CODES or attempt + 1 >= attempts:
+                    return response
+
+            SUPABASE_RETRIES.inc(endpoint=endpoint, method=method)
+            # Full jitter keeps retries from many workers from arriving in lockstep
+            time.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request('DELETE', path, **kwargs)
@@ -0,0 +1,143 @@
+import time
+import logging
+import threading
+import jwt
+import requests
+
+# Algorithms Supabase signs access tokens with: HS256 for the legacy shared secret,
+# RS256/ES256 for asymmetric signing keys published on the JWKS endpoint
+ASYMMETRIC_ALGORITHMS = ['RS256', 'ES256']
+JWKS_PATH = '/auth/v1/.well-known/jwks.json'
+
+
+class NoMatchingKey(Exception):
+    """Raised when no key held locally can check a token, so only Supabase can say if it is valid"""
+
+
+class SupabaseTokenVerifier:
+    def __init__(self, client, jwt_secret=None, audience='authenticated', refresh_interval=600,
+                 min_refresh_gap=30, leeway=10):
+        """
+        Verify Supabase-issued access tokens locally instead of calling /auth/v1/user
+
+        :param client: SupabaseClient used to fetch the JWKS
+        :param jwt_secret: Project JWT secret for HS256 tokens, if the project still uses one
+        :param audience: Expected aud claim
+        :param refresh_interval: Seconds between background JWKS refreshes
+        :param min_refresh_gap: Minimum seconds between on-demand refreshes for unknown key IDs
+        :param leeway: Clock skew tolerated on exp/iat, in seconds
+        """
+        self.client = client
+        self.jwt_secret = jwt_secret
+        self.audience = audience
+        self.issuer = f"{client.url}/auth/v1" if client.url else None
+        self.refresh_interval = refresh_interval
+        self.min_refresh_gap = min_refresh_gap
+        self.leeway = leeway
+        self._keys = {}
+        self._last_refresh = 0
+        self._lock = threading.Lock()
+        self._refresher = None
+
+    def start(self):
+        """Load the signing keys and keep them fresh from a background thread"""
+        if self._refresher is not None or not self.client.url:
+            return
+        self.refresh_keys()
+
+        def refresh_loop():
+            while True:
+                time.sleep(self.refresh_interval)
+                self.refresh_keys()
+
+        self._refresher = threading.Thread(target=refresh_loop, name='jwks-refresh', daemon=True)
+        self._refresher.start()
+
+    def refresh_keys(self):
+        """Fetch the JWKS, keeping the previous keys if the fetch fails"""
+        self._last_refresh = time.monotonic()
+        try:
+            response = self.client.get(JWKS_PATH)
+            if response.status_code != 200:
+                logging.warning(f"JWKS fetch returned {response.status_code}")
+                return False
+            keys = {}
+            for jwk in response.json().get('keys', []):
+                try:
+                    keys[jwk.get('kid')] = jwt.PyJWK(jwk)
+                except jwt.PyJWTError as e:
+                    logging.warning(f"Skipping unusable JWKS key {jwk.get('kid')}: {str(e)}")
+            with self._lock:
+                self._keys = keys
+            return True
+        except requests.RequestException as e:
+            logging.warning(f"JWKS fetch failed: {str(e)}")
+            return False
+
+    @property
+    def enabled(self):
+        """Whether local verification is possible with the keys we have"""
+        with self._lock:
+            return bool(self.jwt_secret or self._keys)
+
+    def verify(self, token):
+        """
+        Check a token's signature and claims
+
+        :param token: Supabase access token
+        :return: The decoded claims, or None if the token is invalid
+        :raises NoMatchingKey: If the token is HS256 and no secret is configured, or its kid is not
+            in the JWKS even after a refresh
+        """
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.PyJWTError:
+            return None
+
+        algorithm = header.get('alg')
+        if algorithm == 'HS256':
+            if not self.jwt_secret:
+                raise NoMatchingKey('No JWT secret configured for HS256 tokens')
+            key = self.jwt_secret
+        elif algorithm in ASYMMETRIC_ALGORITHMS:
+            key = self._signing_key(header.get('kid'))
+            if key is None:
+                raise NoMatchingKey(f"Unknown signing key {header.get('kid')}")
+        else:
+            return None
+
+        try:
+            return jwt.decode(
+                token,
+                key,
+                algorithms=[algorithm],
+                audience=self.audience,
+                issuer=self.issuer,
+                leeway=self.leeway,
+                options={'require': ['exp', 'sub']}
+            )
+        except jwt.PyJWTError:
+            return None
+
+    def _signing_key(self, kid):
+        with self._lock:
+            key = self._keys.get(kid)
+        if key is None and time.monotonic() - self._last_refresh > self.min_refresh_gap:
+            # Keys may have rotated since the last refresh
+            self.refresh_keys()
+            with self._lock:
+                key = self._keys.get(kid)
+        return key.key if key is not None else None
+
+
+def user_from_claims(claims):
+    """Shape verified claims like the /auth/v1/user response callers expect"""
+    return {
+        "id": claims.get("sub"),
+        "email": claims.get("email"),
+        "phone": claims.get("phone"),
+        "role": claims.get("role"),
+        "aud": claims.get("aud"),
+        "app_metadata": claims.get("app_metadata", {}),
+        "user_metadata": claims.get("user_metadata", {})
+    }
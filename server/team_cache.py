@@ -0,0 +1,199 @@
+import hashlib
+import threading
+from collections import deque
+from datetime import datetime
+from codec import encode_json, compress
+
+
+class TeamSnapshot:
+    def __init__(self, team_id, data, fetched_at=None):
+        """
+        One scraped result for a team, immutable once stored
+
+        :param team_id: 8-character DLL Tracker ID
+        :param data: JSON-friendly dictionary returned by the scraper
+        :param fetched_at: When the scrape finished
+        """
+        self.team_id = team_id
+        self.data = data
+        self.fetched_at = fetched_at or datetime.now()
+        # Serialized once here so cache hits never re-encode the nested dicts
+        self.body = encode_json(data)
+        # Depends only on the content, so it survives restarts and agrees across API nodes
+        self.digest = hashlib.sha1(self.body).hexdigest()[:16]
+        # Clients quote the version back as since=; a content digest means the same thing on every node
+        self.version = self.digest
+        self._encoded = {None: self.body}
+        # Encoded delta bodies keyed by the version they start from
+        self._deltas = {}
+
+    @property
+    def etag(self):
+        """Entity tag identifying this version of the team's data"""
+        return f"team-{self.team_id}-{self.digest}"
+
+    def encoded(self, encoding=None):
+        """Response body for a content encoding, compressed at most once per snapshot"""
+        body = self._encoded.get(encoding)
+        if body is None:
+            body = self._encoded[encoding] = compress(self.body, encoding)
+        return body
+
+    def age(self):
+        """Seconds since the scrape finished"""
+        return (datetime.now() - self.fetched_at).total_seconds()
+
+    def delta_etag(self, since):
+        return f"team-{self.team_id}-{self.digest}-since-{since}"
+
+    def delta_body(self, previous):
+        """
+        Encoded changes since an earlier snapshot, or None if a full resync is needed
+
+        Computed and serialized at most once per starting version, so polling clients
+        cost a dictionary lookup once the first of them has asked.
+        """
+        body = self._deltas.get(previous.version)
+        if body is None:
+            delta = snapshot_delta(previous, self)
+            if delta is None:
+                return None
+            body = self._deltas[previous.version] = encode_json(delta)
+        return body
+
+
+def match_keys(data):
+    """
+    Game number of each match card, newest first, or None if it cannot be worked out
+
+    Cards are listed newest first, so the card at index i on the page is game games_played - i
+    in the team's history. The card's own index is used because cards that failed to parse
+    are missing from the list.
+    """
+    games_played = (data.get('team_stats') or {}).get('games_played')
+    if data.get('status') != 'success' or not games_played:
+        return None
+    return [games_played - match.get('index', position) for position, match in enumerate(data.get('matches') or [])]
+
+
+# Card fields that change on every scrape without the match itself changing
+VOLATILE_MATCH_FIELDS = ('index', 'date')
+
+
+def snapshot_delta(previous, current):
+    """
+    What changed between two snapshots of the same team
+
+    New or changed match cards are sent with their game_number; match_keys lists the
+    game numbers now on the page so the client can drop cards that scrolled off. Every
+    other top-level field, and each team_stats entry, is only included when it changed.
+
+    :return: JSON-friendly delta, or None when the snapshots cannot be compared
+    """
+    old_keys, new_keys = match_keys(previous.data), match_keys(current.data)
+    if old_keys is None or new_keys is None:
+        return None
+
+    def stable(match):
+        return {key: value for key, value in match.items() if key not in VOLATILE_MATCH_FIELDS}
+
+    old_matches = {key: stable(match) for key, match in zip(old_keys, previous.data['matches'])}
+    changed_matches = [
+        dict(match, game_number=key)
+        for key, match in zip(new_keys, current.data['matches'])
+        if old_matches.get(key) != stable(match)
+    ]
+
+    old_stats = previous.data.get('team_stats') or {}
+    changed_stats = {
+        name: value for name, value in (current.data.get('team_stats') or {}).items()
+        if old_stats.get(name) != value
+    }
+
+    delta = {
+        'status': 'success',
+        'delta': True,
+        'since': previous.version,
+        'version': current.version,
+        'matches': changed_matches,
+        'match_keys': new_keys,
+        'team_stats': changed_stats
+    }
+    for field, value in current.data.items():
+        if field not in ('status', 'matches', 'team_stats') and previous.data.get(field) != value:
+            delta[field] = value
+    return delta
+
+
+class TeamCache:
+    def __init__(self, versions_kept=8):
+        """
+        Latest versioned snapshot per team, plus a few earlier ones to compute deltas from
+
+        :param versions_kept: Snapshots retained per team; older versions get a full resync
+        """
+        self._snapshots = {}
+        self._history = {}
+        # Latest failed scrape per team, kept apart so it never hides the last good snapshot
+        self._failures = {}
+        self.versions_kept = versions_kept
+        self._lock = threading.Lock()
+
+    def put(self, team_id, data, fetched_at=None):
+        """Store a new result for a team and return its snapshot"""
+        snapshot = TeamSnapshot(team_id, data, fetched_at)
+        with self._lock:
+            self._snapshots[team_id] = snapshot
+            self._failures.pop(team_id, None)
+            history = self._history.get(team_id)
+            if history is None:
+                history = self._history[team_id] = deque(maxlen=self.versions_kept)
+            history.append(snapshot)
+            return snapshot
+
+    def put_failure(self, team_id, data, failed_at=None):
+        """Remember a failed scrape without replacing the team's latest snapshot"""
+        failure = TeamSnapshot(team_id, data, failed_at)
+        with self._lock:
+            self._failures[team_id] = failure
+        return failure
+
+    def get_failure(self, team_id, ttl=None):
+        """
+        Failed scrape since the latest snapshot, or None
+
+        :param ttl: Only return it if it is younger than this many seconds
+        """
+        with self._lock:
+            failure = self._failures.get(team_id)
+        if failure is None or (ttl is not None and failure.age() >= ttl):
+            return None
+        return failure
+
+    def get_version(self, team_id, version):
+        """A specific retained snapshot of a team, or None if it is too old or unknown"""
+        with self._lock:
+            for snapshot in self._history.get(team_id, ()):
+                if snapshot.version == version:
+                    return snapshot
+            return None
+
+    def get(self, team_id):
+        """Latest snapshot for a team regardless of age, or None"""
+        with self._lock:
+            return self._snapshots.get(team_id)
+
+    def get_fresh(self, team_id, ttl):
+        """Latest snapshot if it is younger than ttl seconds, otherwise None"""
+        snapshot = self.get(team_id)
+        if snapshot is not None and snapshot.age() < ttl:
+            return snapshot
+        return None
+
+    def __contains__(self, team_id):
+        with self._lock:
+            return team_id in self._snapshots
+
+    def __len__(self):
+        with self._lock:
+            return len(self._snapshots)
@@ -0,0 +1,136 @@
+import time
+import threading
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        """
+        Token bucket limiting how often an action may start
+
+        :param rate: Tokens added per second
+        :param capacity: Maximum burst size
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self):
+        """Take a token if one is available right now"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def acquire(self, timeout=None):
+        """
+        Wait for a token
+
+        :param timeout: Maximum seconds to wait, None waits forever
+        :return: True if a token was taken, False if the timeout ran out first
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - now
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+    def available(self):
+        """Tokens currently in the bucket"""
+        with self._lock:
+            self._refill(time.monotonic())
+            return round(self._tokens, 2)
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=60):
+        """
+        Stop calling a failing dependency until it has had time to recover
+
+        :param failure_threshold: Consecutive failures that open the circuit
+        :param reset_timeout: Seconds to stay open before letting a single probe through
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now):
+        if self._state == self.OPEN and now - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def allow(self):
+        """Whether a call may go ahead; in half-open state only one probe is let through"""
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def release(self):
+        """Give back an allowed call that never ran, so a half-open probe slot is not lost"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            now = time.monotonic()
+            self._failures += 1
+            if self._current_state(now) == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = now
+                self._probe_in_flight = False
+
+    def stats(self):
+        """State and counters, for /status"""
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            retry_in = None
+            if state == self.OPEN:
+                retry_in = round(max(0, self.reset_timeout - (now - self._opened_at)), 1)
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "retry_in": retry_in
+            }